@@ -1,3 +1,4 @@
-from .compiler import compile
+from .compiler import compile, pack, unpack_counts
 from .q_circuit import QCircuit
 from .gates import CompositeGate
+from .coupling_map import CouplingMap
@@ -1 +1,2 @@
 from .compile import compile
+from .pack import pack, unpack_counts
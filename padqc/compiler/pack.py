@@ -0,0 +1,166 @@
+import logging
+from multiprocessing import Pool
+
+from networkx import topological_sort
+
+from padqc.coupling_map import CouplingMap
+from padqc.gates.single_q_gates import Measure
+from padqc.gates.base_gates import Input, Output, Classic
+from padqc.q_circuit import QCircuit
+from padqc.steps import Patterns, CancelH, CancelCx, ChainLayout, DeterministicSwap, MergeBarrier, StepError
+from .compile import compile
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.CRITICAL)
+
+
+def pack(circuits, coupling_map, chain=None, processes=1, **kwargs):
+    """Compiles several circuits on disjoint segments of a chain of physical qubits
+    and merges them in a single circuit for the whole device.
+
+    Every circuit gets the first connected chain segment, after the one of the previous circuit,
+    with as many qubits as the circuit, and is compiled on it with
+    Patterns, DeterministicSwap, CancelH, CancelCx and MergeBarrier.
+    The registers of the i-th circuit are renamed as *name_i* in the merged circuit.
+
+    Args:
+        circuits (list): the circuits to pack, they are compiled in place if *processes* is 1
+        coupling_map (list | CouplingMap): the coupling map of the device
+        chain (list): the chain of physical qubits, defaults to the chain found by ChainLayout
+            with the qubits of all the circuits
+        processes (int): number of worker processes used to compile the circuits,
+            None uses all the available CPUs. Defaults to 1
+        **kwargs (): options of the DeterministicSwap steps
+
+    Returns:
+        tuple: the merged QCircuit, whose *properties['layout']* holds the physical qubit of every wire,
+            and a list with the packing metadata of every circuit, as a dictionary with keys
+            'q_regs' and 'c_regs', mapping the register names of the circuit to the merged ones,
+            and 'layout', the physical qubits of the circuit wires. See *unpack_counts()*
+    """
+    coupling_map = CouplingMap.from_edges(coupling_map)
+    if chain is None:
+        step = ChainLayout(coupling_map, n_qubits=sum(circuit.n_qubits for circuit in circuits))
+        step.run()
+        chain = step.properties['layout']
+    segments = chain_segments(coupling_map, chain, [circuit.n_qubits for circuit in circuits])
+
+    jobs = [(circuit, coupling_map, segment, kwargs) for circuit, segment in zip(circuits, segments)]
+    if processes != 1 and len(circuits) > 1:
+        with Pool(processes) as pool:
+            compiled = pool.map(_compile_segment, jobs)
+    else:
+        compiled = [_compile_segment(job) for job in jobs]
+
+    merged = QCircuit()
+    packing = list()
+    layout = list()
+    for i, circuit in enumerate(compiled):
+        q_regs = {name: '%s_%d' % (name, i) for name in circuit.q_regs}
+        c_regs = {name: '%s_%d' % (name, i) for name in circuit.c_regs}
+        q_ids = dict()
+        c_ids = dict()
+        for name, (reg_id, dim) in circuit.q_regs.items():
+            q_ids[reg_id] = merged.add_q_register(q_regs[name], dim)[0][0]
+        for name, (reg_id, dim) in circuit.c_regs.items():
+            c_ids[reg_id] = merged.add_c_register(c_regs[name], dim)[0][0]
+        mapping = {q_arg: (q_ids[q_arg[0]], q_arg[1]) for q_arg in circuit.q_regs_list}
+        for node in topological_sort(circuit.q_graph.graph):
+            gate = node.gate
+            if isinstance(gate, (Input, Output, Classic)):
+                continue
+            if isinstance(gate, Measure):
+                gate = Measure(mapping[gate.q_args[0]], (c_ids[gate.c_arg[0]], gate.c_arg[1]))
+            else:
+                gate = gate.remap(mapping)
+            merged.q_graph._append_node(type=node.type, op=gate)
+        circuit_layout = list(circuit.properties['layout'])
+        layout.extend(circuit_layout)
+        packing.append({'q_regs': q_regs, 'c_regs': c_regs, 'layout': circuit_layout})
+        logger.info('Circuit %d on physical qubits %s' % (i, str(circuit_layout)))
+    merged.properties['layout'] = layout
+    return merged, packing
+
+
+def chain_segments(coupling_map, chain, sizes):
+    """Assigns to every size the first connected segment of the chain after the previous one.
+
+    Args:
+        coupling_map (CouplingMap): the coupling map of the device
+        chain (list): the chain of physical qubits
+        sizes (list): the number of qubits of every segment
+
+    Returns:
+        list: the segments of physical qubits
+    """
+    segments = list()
+    offset = 0
+    for size in sizes:
+        while offset + size <= len(chain) and not connected(coupling_map, chain[offset:offset + size]):
+            offset += 1
+        if offset + size > len(chain):
+            raise StepError('Circuits need more than the %d qubits of the chain.' % len(chain))
+        segments.append(chain[offset:offset + size])
+        offset += size
+    return segments
+
+
+def connected(coupling_map, qubits):
+    """Checks if consecutive physical qubits are neighbors in the coupling map.
+
+    Args:
+        coupling_map (CouplingMap): the coupling map of the device
+        qubits (list): a sequence of physical qubits
+
+    Returns:
+        bool: True if every qubit is a neighbor of the next one, False otherwise
+    """
+    return all(coupling_map.adjacent(q1, q2) for q1, q2 in zip(qubits[:-1], qubits[1:]))
+
+
+def _compile_segment(job):
+    """Compiles a circuit on a chain segment, in the current or in a worker process.
+
+    Args:
+        job (tuple): the circuit, the coupling map, the segment and the DeterministicSwap options
+
+    Returns:
+        QCircuit: the compiled circuit
+    """
+    circuit, coupling_map, segment, kwargs = job
+    compile(circuit, steps=[Patterns(), DeterministicSwap(coupling_map, offset=0, **kwargs),
+                            CancelH(), CancelCx(), MergeBarrier()], layout=list(segment), explicit=True)
+    return circuit
+
+
+def unpack_counts(counts, merged, packing):
+    """Splits the counts of a merged circuit in the counts of every packed circuit.
+    Counts are bit strings in the Qiskit format, the last classical register first, every register from
+    its last bit, with optional spaces between registers.
+
+    Args:
+        counts (dict): the counts {bit_string: count, ...} of the merged circuit
+        merged (QCircuit): the merged circuit returned by *pack()*
+        packing (list): the packing metadata returned by *pack()*
+
+    Returns:
+        list: the counts of every packed circuit, in the same format
+    """
+    # start of every classical register in the bit string
+    registers = sorted(merged.c_regs.items(), key=lambda reg: reg[1][0], reverse=True)
+    starts = dict()
+    position = 0
+    for name, (_, dim) in registers:
+        starts[name] = (position, dim)
+        position += dim
+    results = list()
+    for metadata in packing:
+        names = sorted(metadata['c_regs'].values(), key=lambda name: merged.c_regs[name][0], reverse=True)
+        result = dict()
+        for bits, count in counts.items():
+            bits = bits.replace(' ', '')
+            key = ' '.join(bits[starts[name][0]:starts[name][0] + starts[name][1]] for name in names)
+            result[key] = result.get(key, 0) + count
+        results.append(result)
+    return results
@@ -1,2 +1,3 @@
 from .exceptions import QasmError
 from .qasm_converters import qasm_from_circuit, circuit_from_qasm
+from .qasm_emitter import write_qasm
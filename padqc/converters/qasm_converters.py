@@ -1,13 +1,10 @@
-from networkx import topological_sort
-from sympy import pi
-from sympy.parsing.sympy_parser import parse_expr
+from io import StringIO
 
-from qiskit import QuantumCircuit, Aer
-from qiskit.compiler.transpile import transpile
-from qiskit.transpiler import PassManager
-from qiskit.transpiler.passes import Unroller, Optimize1qGates
+from networkx import topological_sort
 
 from padqc.converters import QasmError
+from padqc.converters.qasm_parser import circuit_from_native_qasm, evaluate, _is_hadamard
+from padqc.converters.qasm_emitter import write_qasm
 from padqc.gates import Cx
 from padqc.gates.single_q_gates import Id, Pauli_X, Pauli_Y, Pauli_Z, Rx, Ry, Rz, Hadamard, Measure
 from padqc.gates.base_gates import Barrier, DummyGate
@@ -16,20 +13,24 @@ from padqc.steps import Decompose
 from padqc.compiler import compile
 
 
-def circuit_from_qasm(qasm):
-    """Creates a QCircuit from a QASM circuit, uses Qiskit transpiler
-    to unroll the QASM circuit into basic U gates.
+def circuit_from_qasm(qasm, native=True, sympy=False):
+    """Creates a QCircuit from a QASM circuit, unrolled into u3 and cx gates.
 
     Args:
         qasm (str): a QASM circuit
+        native (bool): if True the circuit is parsed by padqc, otherwise Qiskit transpiler is used
+            to unroll the circuit, for the QASM features that the native parser does not support.
+            Defaults to True
+        sympy (bool): if True and *native* is False the gate parameters are evaluated by SymPy.
+            Defaults to False
 
     Returns:
         QCircuit: the QCircuit equivalent of the provided QASM circuit
     """
+    if native:
+        return circuit_from_native_qasm(qasm)
 
-    pm = PassManager()
-    pm.append(Unroller(['u3', 'cx']))
-    qasm = transpile(QuantumCircuit.from_qasm_str(qasm), pass_manager=pm).qasm()
+    qasm = _unroll(qasm)
     q_circuit = QCircuit()
     lines = list(qasm.split(';\n'))
     for line in lines:
@@ -41,9 +42,9 @@ def circuit_from_qasm(qasm):
             if line.startswith('u3'):
                 q_reg = _q_reg_1q_qasm_gate(line)
                 q_arg = (q_circuit.q_regs[q_reg[0]][0], q_reg[1])
-                params = _qasm_gate_params(line)
+                params = _qasm_gate_params(line, sympy)
                 # print(line)
-                if params[0] == pi.evalf(5)/2 and params[1] == 0 and params[2] == pi.evalf(5):
+                if _is_hadamard(params):
                     # print('H')
                     q_circuit.h(q_arg)
                 else:
@@ -65,15 +66,22 @@ def circuit_from_qasm(qasm):
     return q_circuit
 
 
-def qasm_from_circuit(q_circuit, **kwargs):
-    """Creates a QASM from a QCircuit.
+def qasm_from_circuit(q_circuit, native=True, **kwargs):
+    """Creates a QASM of u3 and cx gates from a QCircuit.
 
     Args:
         q_circuit (QCircuit): a QCircuit
+        native (bool): if True the QASM is written by padqc, otherwise Qiskit transpiler is used
+            to unroll the circuit. Defaults to True
+        **kwargs (): *optimize=True* merges consecutive one qubit gates
 
     Returns:
         str: the QASM equivalent of the provided QCircuit
     """
+    if native:
+        qasm = StringIO()
+        write_qasm(q_circuit, qasm, optimize=kwargs.get('optimize', False))
+        return qasm.getvalue()
 
     q_regs_id = {q_circuit.q_regs[reg][0]: (reg, q_circuit.q_regs[reg][1]) for reg in q_circuit.q_regs}
     c_regs_id = {q_circuit.c_regs[reg][0]: (reg, q_circuit.c_regs[reg][1]) for reg in q_circuit.c_regs}
@@ -154,12 +162,30 @@ def qasm_from_circuit(q_circuit, **kwargs):
                 params += str(node.gate.params[-1]) + ')'
             qasm += node.gate.name + params + ' '
             qasm += q_arg + ';\n'
+    return _unroll(qasm, optimize=kwargs.get('optimize', False))
+
+
+def _unroll(qasm, optimize=False):
+    """Unrolls a QASM circuit into u3 and cx gates with Qiskit transpiler,
+    Qiskit is imported only here as it is slow to load.
+
+    Args:
+        qasm (str): a QASM circuit
+        optimize (bool): if True one qubit gates are merged by Optimize1qGates
+
+    Returns:
+        str: the unrolled QASM circuit
+    """
+    from qiskit import QuantumCircuit
+    from qiskit.compiler.transpile import transpile
+    from qiskit.transpiler import PassManager
+    from qiskit.transpiler.passes import Unroller, Optimize1qGates
+
     pm = PassManager()
     pm.append(Unroller(['u3', 'cx']))
-    if 'optimize' in kwargs and kwargs['optimize'] is True:
+    if optimize is True:
         pm.append(Optimize1qGates())
-    qasm = transpile(QuantumCircuit.from_qasm_str(qasm), pass_manager=pm).qasm()
-    return qasm
+    return transpile(QuantumCircuit.from_qasm_str(qasm), pass_manager=pm).qasm()
 
 
 def _q_reg_1q_qasm_gate(qasm_gate):
@@ -192,23 +218,25 @@ def _q_regs_2q_qasm_gate(qasm_gate):
     return [(q_regs[0].split('[')[0], int(q_regs[0].split('[')[-1][:-1])), (q_regs[1].split('[')[0], int(q_regs[1].split('[')[-1][:-1]))]
 
 
-def _qasm_gate_params(qasm_gate):
-    """Obtains a list of parameters [param1, param2, ...] as floats (or SymPy expressions)
+def _qasm_gate_params(qasm_gate, sympy=False):
+    """Obtains a list of parameters [param1, param2, ...] as floats
     from a parametric one qubit gate QASM string.
 
     Args:
         qasm_gate (str): a one qubit gate QASM string
+        sympy (bool): if True the parameters are evaluated by SymPy, otherwise by *evaluate()*
 
     Returns:
-        list: a list of parameters [param1, param2, ...] as floats (or SymPy expressions)
+        list: a list of parameters [param1, param2, ...] as floats
     """
 
     params = list()
     # print(qasm_gate)
     for param in qasm_gate.split(' ')[0].split('(')[-1][:-1].split(','):
-        if 'pi' in param:
+        if sympy:
+            from sympy.parsing.sympy_parser import parse_expr
             params.append(float(parse_expr(param)))
         else:
-            params.append(float(param))
+            params.append(evaluate(param))
     # print(params)
     return params
@@ -0,0 +1,180 @@
+import cmath
+from math import pi, atan2, isclose
+
+from networkx import topological_sort
+
+from padqc.gates import Cx
+from padqc.gates.single_q_gates import Id, Pauli_X, Pauli_Y, Pauli_Z, Rx, Ry, Rz, Hadamard, Measure
+from padqc.gates.base_gates import Input, Output, Classic, Barrier, DummyGate
+from padqc.steps import Decompose
+from padqc.compiler import compile
+from .exceptions import QasmError
+from .qasm_parser import gate_expansion
+
+_HEADER = 'OPENQASM 2.0;\ninclude "qelib1.inc";\n'
+_QREG = 'qreg %s[%d];\n'
+_CREG = 'creg %s[%d];\n'
+_U3 = 'u3(%r,%r,%r) %s[%d];\n'
+_CX = 'cx %s[%d],%s[%d];\n'
+_MEASURE = 'measure %s[%d] -> %s[%d];\n'
+_BIT = '%s[%d]'
+
+# the u3 parameters (theta, phi, lambda) of every one qubit gate
+_U3_PARAMS = {
+    Id: lambda gate: (0., 0., 0.),
+    Pauli_X: lambda gate: (pi, 0., pi),
+    Pauli_Y: lambda gate: (pi, pi / 2, pi / 2),
+    Pauli_Z: lambda gate: (0., 0., pi),
+    Hadamard: lambda gate: (pi / 2, 0., pi),
+    Rx: lambda gate: (float(gate.theta), -pi / 2, pi / 2),
+    Ry: lambda gate: (float(gate.theta), 0., 0.),
+    Rz: lambda gate: (0., 0., float(gate.theta)),
+}
+
+_IDENTITY = ((1, 0), (0, 1))
+
+
+def write_qasm(q_circuit, file, optimize=False):
+    """Writes a QCircuit as an OpenQASM 2.0 circuit of u3 and cx gates, the circuit is decomposed in place.
+
+    Args:
+        q_circuit (QCircuit): a QCircuit
+        file (io.TextIOBase): the file or the string buffer where the QASM is written
+        optimize (bool): if True consecutive one qubit gates on the same qubit are merged in a single u3 gate,
+            identities are removed. Defaults to False
+    """
+    q_names = {reg_id: name for name, (reg_id, _) in q_circuit.q_regs.items()}
+    c_names = {reg_id: name for name, (reg_id, _) in q_circuit.c_regs.items()}
+    if len(q_names) == 0:
+        raise QasmError("Quantum circuit must have at least one quantum register")
+    write = file.write
+    write(_HEADER)
+    for name, (_, dim) in q_circuit.q_regs.items():
+        write(_QREG % (name, dim))
+    for name, (_, dim) in q_circuit.c_regs.items():
+        write(_CREG % (name, dim))
+
+    compile(q_circuit=q_circuit, steps=[Decompose()])
+
+    # one qubit gates not written yet, as {q_arg: matrix}, when optimizing
+    pending = dict()
+
+    def u3(q_arg, params):
+        if optimize:
+            pending[q_arg] = _product(_u3_matrix(*params), pending.get(q_arg, _IDENTITY))
+        else:
+            write(_U3 % (params[0], params[1], params[2], q_names[q_arg[0]], q_arg[1]))
+
+    def flush(q_args):
+        for q_arg in q_args:
+            if q_arg in pending:
+                params = _u3_params(pending.pop(q_arg))
+                if params is not None:
+                    write(_U3 % (params[0], params[1], params[2], q_names[q_arg[0]], q_arg[1]))
+
+    def cx(control, target):
+        flush((control, target))
+        write(_CX % (q_names[control[0]], control[1], q_names[target[0]], target[1]))
+
+    def barrier(q_args):
+        flush(q_args)
+        write('barrier ' + ','.join(_BIT % (q_names[q_arg[0]], q_arg[1]) for q_arg in q_args) + ';\n')
+
+    for node in topological_sort(q_circuit.q_graph.graph):
+        gate = node.gate
+        kind = type(gate)
+        if kind in _U3_PARAMS:
+            u3(gate.q_args[0], _U3_PARAMS[kind](gate))
+        elif kind is Cx:
+            cx(gate.control, gate.target)
+        elif kind is Measure:
+            q_arg = gate.q_args[0]
+            flush((q_arg,))
+            write(_MEASURE % (q_names[q_arg[0]], q_arg[1], c_names[gate.c_arg[0]], gate.c_arg[1]))
+        elif kind is Barrier:
+            barrier(gate.q_args)
+        elif kind is DummyGate:
+            for name, params, indexes in gate_expansion(gate.name, gate.params):
+                q_args = [gate.q_args[i] for i in indexes]
+                if name == 'U':
+                    u3(q_args[0], params)
+                elif name == 'CX':
+                    cx(q_args[0], q_args[1])
+                else:
+                    barrier(q_args)
+        elif kind not in (Input, Output, Classic):
+            raise QasmError('Gate %s can not be written as QASM.' % gate.name)
+    flush(sorted(pending))
+
+
+def _u3_matrix(theta, phi, lam):
+    """
+    Args:
+        theta (float): the u3 theta parameter
+        phi (float): the u3 phi parameter
+        lam (float): the u3 lambda parameter
+
+    Returns:
+        tuple: the unitary matrix of the u3 gate, as a tuple of rows
+    """
+    cos = cmath.cos(theta / 2)
+    sin = cmath.sin(theta / 2)
+    return ((cos, -cmath.exp(1j * lam) * sin),
+            (cmath.exp(1j * phi) * sin, cmath.exp(1j * (phi + lam)) * cos))
+
+
+def _product(a, b):
+    """
+    Args:
+        a (tuple): a 2x2 matrix as a tuple of rows
+        b (tuple): a 2x2 matrix as a tuple of rows
+
+    Returns:
+        tuple: the matrix product a b
+    """
+    return ((a[0][0] * b[0][0] + a[0][1] * b[1][0], a[0][0] * b[0][1] + a[0][1] * b[1][1]),
+            (a[1][0] * b[0][0] + a[1][1] * b[1][0], a[1][0] * b[0][1] + a[1][1] * b[1][1]))
+
+
+def _u3_params(matrix):
+    """Finds the u3 gate equal to a one qubit unitary matrix, up to a global phase.
+
+    Args:
+        matrix (tuple): a 2x2 unitary matrix as a tuple of rows
+
+    Returns:
+        tuple: the u3 parameters (theta, phi, lambda), None if the matrix is an identity
+    """
+    (a, b), (c, d) = matrix
+    theta = 2 * atan2(abs(c), abs(a))
+    if abs(c) < 1e-9:
+        # diagonal matrix, only phi + lambda matters
+        phi = 0.
+        lam = cmath.phase(d) - cmath.phase(a)
+    elif abs(a) < 1e-9:
+        # anti-diagonal matrix, only phi - lambda matters
+        phi = 0.
+        lam = cmath.phase(-b) - cmath.phase(c)
+    else:
+        phase = cmath.phase(a)
+        phi = cmath.phase(c) - phase
+        lam = cmath.phase(-b) - phase
+    phi = _normalized(phi)
+    lam = _normalized(lam)
+    if isclose(theta, 0, abs_tol=1e-9) and isclose(phi + lam, 0, abs_tol=1e-9):
+        return None
+    return theta, phi, lam
+
+
+def _normalized(angle):
+    """
+    Args:
+        angle (float): an angle
+
+    Returns:
+        float: the same angle in (-pi, pi], rounding errors around 0 are removed
+    """
+    angle = angle % (2 * pi)
+    if angle > pi:
+        angle -= 2 * pi
+    return 0. if abs(angle) < 1e-12 else angle
@@ -0,0 +1,552 @@
+import operator
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from math import pi, sin, cos, tan, exp, log, sqrt, isclose
+
+from padqc.q_circuit import QCircuit
+from .exceptions import QasmError
+
+# the gates of qelib1.inc, as in Qiskit 0.21
+QELIB1 = """
+gate u3(theta,phi,lambda) q { U(theta,phi,lambda) q; }
+gate u2(phi,lambda) q { U(pi/2,phi,lambda) q; }
+gate u1(lambda) q { U(0,0,lambda) q; }
+gate cx c,t { CX c,t; }
+gate id a { U(0,0,0) a; }
+gate u0(gamma) q { U(0,0,0) q; }
+gate u(theta,phi,lambda) q { U(theta,phi,lambda) q; }
+gate p(lambda) q { U(0,0,lambda) q; }
+gate x a { u3(pi,0,pi) a; }
+gate y a { u3(pi,pi/2,pi/2) a; }
+gate z a { u1(pi) a; }
+gate h a { u2(0,pi) a; }
+gate s a { u1(pi/2) a; }
+gate sdg a { u1(-pi/2) a; }
+gate t a { u1(pi/4) a; }
+gate tdg a { u1(-pi/4) a; }
+gate rx(theta) a { u3(theta,-pi/2,pi/2) a; }
+gate ry(theta) a { u3(theta,0,0) a; }
+gate rz(phi) a { u1(phi) a; }
+gate sx a { sdg a; h a; sdg a; }
+gate sxdg a { s a; h a; s a; }
+gate cz a,b { h b; cx a,b; h b; }
+gate cy a,b { sdg b; cx a,b; s b; }
+gate swap a,b { cx a,b; cx b,a; cx a,b; }
+gate ch a,b { h b; sdg b; cx a,b; h b; t b; cx a,b; t b; h b; s b; x b; s a; }
+gate ccx a,b,c { h c; cx b,c; tdg c; cx a,c; t c; cx b,c; tdg c; cx a,c; t b; t c; h c; cx a,b; t a; tdg b;
+                 cx a,b; }
+gate cswap a,b,c { cx c,b; ccx a,b,c; cx c,b; }
+gate crx(lambda) a,b { u1(pi/2) b; cx a,b; u3(-lambda/2,0,0) b; cx a,b; u3(lambda/2,-pi/2,0) b; }
+gate cry(lambda) a,b { ry(lambda/2) b; cx a,b; ry(-lambda/2) b; cx a,b; }
+gate crz(lambda) a,b { rz(lambda/2) b; cx a,b; rz(-lambda/2) b; cx a,b; }
+gate cu1(lambda) a,b { u1(lambda/2) a; cx a,b; u1(-lambda/2) b; cx a,b; u1(lambda/2) b; }
+gate cp(lambda) a,b { p(lambda/2) a; cx a,b; p(-lambda/2) b; cx a,b; p(lambda/2) b; }
+gate cu3(theta,phi,lambda) c,t { u1((lambda+phi)/2) c; u1((lambda-phi)/2) t; cx c,t;
+                                 u3(-theta/2,0,-(phi+lambda)/2) t; cx c,t; u3(theta/2,phi,0) t; }
+gate csx a,b { h b; cu1(pi/2) a,b; h b; }
+gate cu(theta,phi,lambda,gamma) c,t { p(gamma) c; p((lambda+phi)/2) c; p((lambda-phi)/2) t; cx c,t;
+                                      u(-theta/2,0,-(phi+lambda)/2) t; cx c,t; u(theta/2,phi,0) t; }
+gate rxx(theta) a,b { u3(pi/2,theta,0) a; h b; cx a,b; u1(-theta) b; cx a,b; h b; u2(-pi,pi-theta) a; }
+gate rzz(theta) a,b { cx a,b; u1(theta) b; cx a,b; }
+gate rccx a,b,c { u2(0,pi) c; u1(pi/4) c; cx b,c; u1(-pi/4) c; cx a,c; u1(pi/4) c; cx b,c; u1(-pi/4) c;
+                  u2(0,pi) c; }
+"""
+
+# every match is a token preceded by blanks and comments
+_TOKEN = re.compile(r"""
+    (?:\s+|//[^\n]*)*
+    (?:(?P<real>(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?|\d+[eE][-+]?\d+)
+  | (?P<int>\d+)
+  | (?P<id>[a-zA-Z_][a-zA-Z0-9_]*)
+  | (?P<string>"[^"\n]*")
+  | (?P<symbol>->|==|[;,()\[\]{}+\-*/^])
+  | (?P<eof>\Z)
+  | (?P<error>.))
+""", re.VERBOSE)
+
+_OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv, '^': operator.pow}
+
+_FUNCTIONS = {'sin': sin, 'cos': cos, 'tan': tan, 'exp': exp, 'ln': log, 'sqrt': sqrt}
+
+# the builtin gates, as {name: (n_params, n_qubits, body)}
+_BUILTINS = {'U': (3, 1, None), 'CX': (0, 2, None)}
+
+# maximum number of gate expansions kept by every parser, as parametric gates rarely repeat their parameters
+EXPANSION_CACHE_SIZE = 4096
+
+# the qelib1.inc gate definitions, parsed on the first include
+_qelib1 = dict()
+
+# a parser holding the qelib1.inc gates, to expand single gates
+_library = list()
+
+
+def circuit_from_native_qasm(qasm):
+    """Creates a QCircuit from an OpenQASM 2.0 circuit without Qiskit.
+    Every gate is expanded to U and CX through its definition, U gates become Hadamard gates when
+    they are equal to u2(0, pi) and dummy *u3* gates otherwise.
+
+    Args:
+        qasm (str): a QASM circuit
+
+    Returns:
+        QCircuit: the QCircuit equivalent of the provided QASM circuit
+    """
+    q_circuit = QCircuit()
+    QasmParser(qasm).parse(q_circuit)
+    return q_circuit
+
+
+class _Tokens:
+    """
+    The tokens of a QASM string, read one at a time.
+    """
+    def __init__(self, text):
+        """
+        Args:
+            text (str): the QASM string
+        """
+        self._text = text
+        self._matches = _TOKEN.finditer(text)
+        self.kind = None
+        self.value = None
+        self.position = 0
+        self.advance()
+
+    def advance(self):
+        """Moves to the next token.
+
+        Returns:
+            str: the value of the current token, before moving
+        """
+        value = self.value
+        match = next(self._matches, None)
+        if match is None:
+            self.kind, self.value, self.position = 'eof', '', len(self._text)
+            return value
+        kind = match.lastgroup
+        self.kind, self.value, self.position = kind, match.group(kind), match.start(kind)
+        if self.kind == 'error':
+            raise self.error('Unexpected character %s' % self.value)
+        return value
+
+    def expect(self, value):
+        """Moves to the next token, if the current one has the expected value.
+
+        Args:
+            value (str): the expected value
+        """
+        if self.value != value or self.kind == 'string':
+            raise self.error('Expected %s, found %s' % (value, self.value or 'end of file'))
+        self.advance()
+
+    def expect_kind(self, kind):
+        """Moves to the next token, if the current one has the expected kind.
+
+        Args:
+            kind (str): the expected kind, one of real, int, id and string
+
+        Returns:
+            str: the value of the token
+        """
+        if self.kind != kind:
+            raise self.error('Expected %s, found %s' % (kind, self.value or 'end of file'))
+        return self.advance()
+
+    def error(self, message):
+        """
+        Args:
+            message (str): the error message
+
+        Returns:
+            QasmError: an error with the message and the line of the current token
+        """
+        return QasmError('%s at line %d.' % (message, self._text.count('\n', 0, self.position) + 1))
+
+
+class QasmParser:
+    """
+    A parser of OpenQASM 2.0 circuits, it applies the gates of the circuit to a QCircuit expanded to U and CX.
+    Reset, conditional and opaque gates are not supported.
+    """
+    def __init__(self, qasm):
+        """
+        Args:
+            qasm (str): a QASM circuit
+        """
+        self._tokens = _Tokens(qasm)
+        self._gates = dict(_BUILTINS)
+        # expansions of the gates already applied, as {(name, params): [(kind, params, q_args), ...]},
+        # least recently used first
+        self._expansions = OrderedDict()
+        self._q_regs = dict()
+        self._c_regs = dict()
+
+    def parse(self, q_circuit):
+        """Applies the circuit to a QCircuit.
+
+        Args:
+            q_circuit (QCircuit): the circuit receiving registers and gates
+        """
+        tokens = self._tokens
+        if tokens.value == 'OPENQASM':
+            tokens.advance()
+            version = tokens.advance()
+            if version not in ('2', '2.0'):
+                raise tokens.error('Unsupported OPENQASM version %s' % version)
+            tokens.expect(';')
+        while tokens.kind != 'eof':
+            statement = tokens.expect_kind('id')
+            if statement == 'include':
+                self._include()
+            elif statement == 'qreg' or statement == 'creg':
+                self._register(q_circuit, statement)
+            elif statement == 'gate':
+                self._gate_definition()
+            elif statement == 'measure':
+                self._measure(q_circuit)
+            elif statement == 'barrier':
+                q_args = [q_arg for arg in self._arg_list() for q_arg in self._q_arg(arg)]
+                q_circuit.barrier(*q_args)
+                tokens.expect(';')
+            elif statement in ('opaque', 'reset', 'if'):
+                raise tokens.error('%s is not supported by the native parser, use native=False' % statement)
+            else:
+                self._gate_statement(q_circuit, statement)
+
+    def _include(self):
+        tokens = self._tokens
+        name = tokens.expect_kind('string')[1:-1]
+        if name != 'qelib1.inc':
+            raise tokens.error('Only qelib1.inc can be included by the native parser, use native=False')
+        tokens.expect(';')
+        if len(_qelib1) == 0:
+            parser = QasmParser(QELIB1)
+            parser.parse(None)
+            _qelib1.update(parser._gates)
+        for name, definition in _qelib1.items():
+            if name in self._gates and self._gates[name] is not definition:
+                raise tokens.error('Gate %s already defined' % name)
+            self._gates[name] = definition
+
+    def _register(self, q_circuit, statement):
+        tokens = self._tokens
+        name = tokens.expect_kind('id')
+        tokens.expect('[')
+        dim = int(tokens.expect_kind('int'))
+        tokens.expect(']')
+        tokens.expect(';')
+        if name in self._q_regs or name in self._c_regs:
+            raise tokens.error('Register %s already defined' % name)
+        if statement == 'qreg':
+            self._q_regs[name] = (q_circuit.add_q_register(name, dim)[0][0], dim)
+        else:
+            self._c_regs[name] = (q_circuit.add_c_register(name, dim)[0][0], dim)
+
+    def _gate_definition(self):
+        tokens = self._tokens
+        name = tokens.expect_kind('id')
+        if name in self._gates:
+            raise tokens.error('Gate %s already defined' % name)
+        params = list()
+        if tokens.value == '(':
+            tokens.advance()
+            if tokens.value != ')':
+                params = self._id_list()
+            tokens.expect(')')
+        q_args = self._id_list()
+        if len(set(params)) != len(params) or len(set(q_args)) != len(q_args):
+            raise tokens.error('Repeated argument in gate %s' % name)
+        params = {param: i for i, param in enumerate(params)}
+        q_args = {q_arg: i for i, q_arg in enumerate(q_args)}
+        body = list()
+        tokens.expect('{')
+        while tokens.value != '}':
+            gate = tokens.expect_kind('id')
+            if gate == 'barrier':
+                args = self._id_list()
+                exprs = ()
+            else:
+                exprs = self._params(params)
+                args = self._id_list()
+            for arg in args:
+                if arg not in q_args:
+                    raise tokens.error('Unknown argument %s in gate %s' % (arg, name))
+            args = tuple(q_args[arg] for arg in args)
+            if gate != 'barrier':
+                self._check_gate(gate, len(exprs), len(args))
+            body.append((gate, exprs, args))
+            tokens.expect(';')
+        tokens.advance()
+        self._gates[name] = (len(params), len(q_args), body)
+
+    def _gate_statement(self, q_circuit, name):
+        tokens = self._tokens
+        exprs = self._params(None)
+        args = [self._q_arg(arg) for arg in self._arg_list()]
+        tokens.expect(';')
+        self._check_gate(name, len(exprs), len(args))
+        expansion = self._expand(name, tuple(exprs))
+        for q_args in self._broadcast(args):
+            if len(set(q_args)) != len(q_args):
+                raise tokens.error('Repeated qubit in gate %s' % name)
+            for kind, params, indexes in expansion:
+                if kind == 'CX':
+                    q_circuit.cx(q_args[indexes[0]], q_args[indexes[1]])
+                elif kind == 'U':
+                    if _is_hadamard(params):
+                        q_circuit.h(q_args[indexes[0]])
+                    else:
+                        q_circuit.dummy_gate(name='u3', q_args=[q_args[indexes[0]]], params=list(params))
+                else:
+                    q_circuit.barrier(*[q_args[i] for i in indexes])
+
+    def _measure(self, q_circuit):
+        tokens = self._tokens
+        q_args = self._q_arg(self._arg())
+        tokens.expect('->')
+        c_args = self._c_arg(self._arg())
+        tokens.expect(';')
+        if len(q_args) != len(c_args):
+            raise tokens.error('Quantum register size (%d) different from classical register size (%d)'
+                               % (len(q_args), len(c_args)))
+        for q_arg, c_arg in zip(q_args, c_args):
+            q_circuit.measure(q_arg, c_arg)
+
+    def _expand(self, name, params):
+        """Expands a gate to U, CX and barriers, the last EXPANSION_CACHE_SIZE expansions are cached.
+
+        Args:
+            name (str): the gate name
+            params (tuple): the gate parameters as floats
+
+        Returns:
+            list: a list of tuples (kind, params, q_args), where kind is U, CX or barrier,
+                and q_args are the indexes of the gate arguments
+        """
+        key = (name, params)
+        if key in self._expansions:
+            self._expansions.move_to_end(key)
+        else:
+            n_params, n_qubits, body = self._gates[name]
+            if body is None:
+                expansion = [(name, params, tuple(range(n_qubits)))]
+            else:
+                expansion = list()
+                for gate, exprs, args in body:
+                    values = tuple(expr(params) if callable(expr) else expr for expr in exprs)
+                    if gate == 'barrier':
+                        expansion.append((gate, values, args))
+                        continue
+                    for kind, sub_params, sub_args in self._expand(gate, values):
+                        expansion.append((kind, sub_params, tuple(args[i] for i in sub_args)))
+            self._expansions[key] = expansion
+            while len(self._expansions) > EXPANSION_CACHE_SIZE:
+                self._expansions.popitem(last=False)
+        return self._expansions[key]
+
+    def _check_gate(self, name, n_params, n_qubits):
+        if name not in self._gates:
+            raise self._tokens.error('Unknown gate %s' % name)
+        if self._gates[name][:2] != (n_params, n_qubits):
+            raise self._tokens.error('Gate %s needs %d parameters and %d qubits'
+                                     % (name, self._gates[name][0], self._gates[name][1]))
+
+    def _broadcast(self, args):
+        """
+        Args:
+            args (list): the qubits of every argument, a list with one qubit or a whole register
+
+        Returns:
+            list: the qubits of every application of the gate, registers are applied index by index
+        """
+        sizes = set(len(arg) for arg in args if len(arg) > 1)
+        if len(sizes) > 1:
+            raise self._tokens.error('Registers of different sizes in the same gate')
+        size = sizes.pop() if sizes else 1
+        return [tuple(arg[i] if len(arg) > 1 else arg[0] for arg in args) for i in range(size)]
+
+    def _q_arg(self, arg):
+        return self._bits(arg, self._q_regs, 'quantum')
+
+    def _c_arg(self, arg):
+        return self._bits(arg, self._c_regs, 'classical')
+
+    def _bits(self, arg, regs, kind):
+        """
+        Args:
+            arg (tuple): a tuple (register name, index), the index is None for a whole register
+            regs (dict): the registers as {name: (reg_id, dim)}
+            kind (str): the register kind, for the error messages
+
+        Returns:
+            list: the bits (reg_id, index) of the argument
+        """
+        name, index = arg
+        if name not in regs:
+            raise self._tokens.error('Unknown %s register %s' % (kind, name))
+        reg_id, dim = regs[name]
+        if index is None:
+            return [(reg_id, i) for i in range(dim)]
+        if index >= dim:
+            raise self._tokens.error('Index %d out of range for register %s' % (index, name))
+        return [(reg_id, index)]
+
+    def _arg(self):
+        tokens = self._tokens
+        name = tokens.expect_kind('id')
+        if tokens.value != '[':
+            return name, None
+        tokens.advance()
+        index = int(tokens.expect_kind('int'))
+        tokens.expect(']')
+        return name, index
+
+    def _arg_list(self):
+        args = [self._arg()]
+        while self._tokens.value == ',':
+            self._tokens.advance()
+            args.append(self._arg())
+        return args
+
+    def _id_list(self):
+        ids = [self._tokens.expect_kind('id')]
+        while self._tokens.value == ',':
+            self._tokens.advance()
+            ids.append(self._tokens.expect_kind('id'))
+        return ids
+
+    def _params(self, names):
+        """
+        Args:
+            names (dict): the parameters of the gate being defined as {name: index}, None outside of gates
+
+        Returns:
+            list: the parameters, as floats or functions of the tuple of the gate parameters
+        """
+        tokens = self._tokens
+        exprs = list()
+        if tokens.value == '(':
+            tokens.advance()
+            if tokens.value != ')':
+                exprs.append(self._expression(names))
+                while tokens.value == ',':
+                    tokens.advance()
+                    exprs.append(self._expression(names))
+            tokens.expect(')')
+        return exprs
+
+    def _expression(self, names):
+        value = self._term(names)
+        while self._tokens.value in ('+', '-'):
+            value = self._binary(self._tokens.advance(), value, self._term(names))
+        return value
+
+    def _term(self, names):
+        value = self._unary(names)
+        while self._tokens.value in ('*', '/'):
+            value = self._binary(self._tokens.advance(), value, self._unary(names))
+        return value
+
+    def _unary(self, names):
+        if self._tokens.value == '-':
+            self._tokens.advance()
+            value = self._unary(names)
+            return (lambda params: -value(params)) if callable(value) else -value
+        if self._tokens.value == '+':
+            self._tokens.advance()
+            return self._unary(names)
+        value = self._primary(names)
+        if self._tokens.value == '^':
+            value = self._binary(self._tokens.advance(), value, self._unary(names))
+        return value
+
+    def _primary(self, names):
+        tokens = self._tokens
+        if tokens.kind in ('real', 'int'):
+            return float(tokens.advance())
+        if tokens.value == '(':
+            tokens.advance()
+            value = self._expression(names)
+            tokens.expect(')')
+            return value
+        name = tokens.expect_kind('id')
+        if name == 'pi':
+            return pi
+        if name in _FUNCTIONS:
+            function = _FUNCTIONS[name]
+            tokens.expect('(')
+            value = self._expression(names)
+            tokens.expect(')')
+            if callable(value):
+                return lambda params: function(value(params))
+            return self._evaluate(function, value)
+        if names is None or name not in names:
+            raise tokens.error('Unknown parameter %s' % name)
+        index = names[name]
+        return lambda params: params[index]
+
+    def _binary(self, symbol, left, right):
+        function = _OPERATORS[symbol]
+        if callable(left) or callable(right):
+            left_value = left if callable(left) else (lambda params: left)
+            right_value = right if callable(right) else (lambda params: right)
+            return lambda params: function(left_value(params), right_value(params))
+        return self._evaluate(function, left, right)
+
+    def _evaluate(self, function, *values):
+        try:
+            return function(*values)
+        except (ArithmeticError, ValueError) as error:
+            raise self._tokens.error('Invalid expression (%s)' % str(error))
+
+
+def _is_hadamard(params):
+    """
+    Args:
+        params (tuple): the parameters of a U gate
+
+    Returns:
+        bool: True if the gate is u2(0, pi), an Hadamard gate
+    """
+    return isclose(params[0], pi / 2) and isclose(params[1], 0, abs_tol=1e-12) and isclose(params[2], pi)
+
+
+def gate_expansion(name, params):
+    """Expands a gate of qelib1.inc to U and CX.
+
+    Args:
+        name (str): the gate name
+        params (list): the gate parameters as floats
+
+    Returns:
+        list: a list of tuples (kind, params, q_args), where kind is U or CX,
+            and q_args are the indexes of the gate arguments
+    """
+    if len(_library) == 0:
+        parser = QasmParser('include "qelib1.inc";')
+        parser.parse(None)
+        _library.append(parser)
+    parser = _library[0]
+    if name not in parser._gates or parser._gates[name][0] != len(params):
+        raise QasmError('Unknown gate %s with %d parameters.' % (name, len(params)))
+    return parser._expand(name, tuple(float(param) for param in params))
+
+
+@lru_cache(maxsize=4096)
+def evaluate(expression):
+    """Evaluates a constant QASM parameter expression, made of numbers, pi, the operators + - * / ^,
+    parentheses and the functions sin, cos, tan, exp, ln and sqrt. The results are cached.
+
+    Args:
+        expression (str): the parameter expression, as *pi/2*
+
+    Returns:
+        float: the value of the expression
+    """
+    parser = QasmParser(expression)
+    value = parser._expression(None)
+    if parser._tokens.kind != 'eof':
+        raise parser._tokens.error('Unexpected %s in expression %s' % (parser._tokens.value, expression))
+    return float(value)
@@ -0,0 +1,3 @@
+from .exceptions import CouplingMapError
+from .coupling_map import CouplingMap
+from .library import DEVICES, MELBOURNE, TOKYO, ALMADEN, ROCHESTER, device, line, ring, grid, heavy_hex
@@ -0,0 +1,389 @@
+from collections import OrderedDict, deque
+from hashlib import sha1
+from time import perf_counter
+
+import numpy as np
+
+from .exceptions import CouplingMapError
+
+# maximum number of coupling maps kept in memory, every one holds dense n x n distance and next-hop matrices
+COUPLING_MAP_CACHE_SIZE = 16
+# maximum number of chains whose positions are kept by every coupling map
+CHAIN_POSITIONS_CACHE_SIZE = 64
+
+# coupling maps already built in this process, indexed by their normalized edge list, least recently used first
+_coupling_maps = OrderedDict()
+
+
+class CouplingMap:
+    """
+    The coupling map class, it holds the connectivity of a device together with the data
+    derived from it, so that every device is preprocessed only once per process.
+
+    Example:
+                coupling_map = CouplingMap.from_edges([(0, 1), (1, 2), (1, 3)])
+
+                coupling_map.directed_map = {0: [1], 1: [2, 3], 2: [], 3: []}
+
+                coupling_map.undirected_map = {0: [1], 1: [0, 2, 3], 2: [1], 3: [1]}
+
+                coupling_map.distance[0, 3] = 2
+    """
+    def __init__(self, edges):
+        """Initializes the coupling map from its edges.
+
+        Args:
+            edges (list): a list of tuples (q1, q2) representing the edges of the coupling map,
+                a CNOT with control q1 and target q2 can be applied on the device
+        """
+        if len(edges) == 0:
+            raise CouplingMapError('Coupling map must have at least one edge.')
+        self._edges = list()
+        for edge in edges:
+            if len(edge) != 2 or not all(isinstance(q, (int, np.integer)) and q >= 0 for q in edge):
+                raise CouplingMapError('Edge %s is not valid.' % str(edge))
+            self._edges.append((int(edge[0]), int(edge[1])))
+        self._n_qubits = max(max(edge) for edge in self._edges) + 1
+        self._directed_map = dict()
+        self._undirected_map = dict()
+        self._adjacency = [0] * self._n_qubits
+        self._directed_adjacency = [0] * self._n_qubits
+        for edge in self._edges:
+            for q in edge:
+                if q not in self._directed_map:
+                    self._directed_map[q] = list()
+                    self._undirected_map[q] = list()
+            self._directed_map[edge[0]].append(edge[1])
+            self._directed_adjacency[edge[0]] |= 1 << edge[1]
+            if edge[1] not in self._undirected_map[edge[0]]:
+                self._undirected_map[edge[0]].append(edge[1])
+            if edge[0] not in self._undirected_map[edge[1]]:
+                self._undirected_map[edge[1]].append(edge[0])
+            self._adjacency[edge[0]] |= 1 << edge[1]
+            self._adjacency[edge[1]] |= 1 << edge[0]
+        self._directed = any(not self.is_edge(edge[1], edge[0]) for edge in self._edges)
+        self._distance = None
+        self._next_hop = None
+        # positions of the chains already requested, least recently used first
+        self._chain_positions = OrderedDict()
+        self._longest_paths = dict()
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Returns the coupling map with the given edges, building it only the first time
+        it is requested in the process.
+
+        Args:
+            edges (list | CouplingMap): a list of tuples (q1, q2) representing the edges of the coupling map
+
+        Returns:
+            CouplingMap: the coupling map
+        """
+        if isinstance(edges, CouplingMap):
+            return edges
+        key = normalized_edges(edges)
+        if key in _coupling_maps:
+            _coupling_maps.move_to_end(key)
+        else:
+            _remember(key, cls(edges))
+        return _coupling_maps[key]
+
+    def __getstate__(self):
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.key not in _coupling_maps:
+            _remember(self.key, self)
+
+    def __len__(self):
+        return len(self._undirected_map)
+
+    @property
+    def key(self):
+        """
+        Returns:
+            tuple: the sorted tuple of the distinct edges, identifying the coupling map
+        """
+        return normalized_edges(self._edges)
+
+    @property
+    def digest(self):
+        """
+        Returns:
+            str: a hash of the normalized edge list, identifying the coupling map across processes
+        """
+        return sha1(str(self.key).encode()).hexdigest()
+
+    @property
+    def edges(self):
+        """
+        Returns:
+            list: the list of edges (q1, q2) of the coupling map
+        """
+        return self._edges
+
+    @property
+    def n_qubits(self):
+        """
+        Returns:
+            int: the number of physical qubits, as the highest qubit index + 1
+        """
+        return self._n_qubits
+
+    @property
+    def directed(self):
+        """
+        Returns:
+            bool: True if at least one edge can be used in one direction only, False otherwise
+        """
+        return self._directed
+
+    @property
+    def directed_map(self):
+        """
+        Returns:
+            dict: the directed coupling map as a dictionary {q: [targets], ...}
+        """
+        return self._directed_map
+
+    @property
+    def undirected_map(self):
+        """
+        Returns:
+            dict: the undirected coupling map as a dictionary {q: [neighbors], ...}
+        """
+        return self._undirected_map
+
+    @property
+    def adjacency(self):
+        """
+        Returns:
+            list: the undirected adjacency bitsets, bit n of *adjacency[q]* is set if q and n are neighbors
+        """
+        return self._adjacency
+
+    def neighbors(self, q):
+        """
+        Args:
+            q (int): a physical qubit
+
+        Returns:
+            list: the neighbors of q
+        """
+        return self._undirected_map.get(q, [])
+
+    def adjacent(self, q1, q2):
+        """Checks if two physical qubits are connected, in any direction.
+
+        Args:
+            q1 (int): a physical qubit
+            q2 (int): a physical qubit
+
+        Returns:
+            bool: True if q1 and q2 are neighbors, False otherwise
+        """
+        return q1 < self._n_qubits and (self._adjacency[q1] >> q2) & 1 == 1
+
+    def is_edge(self, control, target):
+        """Checks if a CNOT can be applied between two physical qubits without inverting it.
+
+        Args:
+            control (int): the control physical qubit
+            target (int): the target physical qubit
+
+        Returns:
+            bool: True if (control, target) is an edge of the coupling map, False otherwise
+        """
+        return control < self._n_qubits and (self._directed_adjacency[control] >> target) & 1 == 1
+
+    @property
+    def distance(self):
+        """
+        Returns:
+            numpy.ndarray: the distance matrix, where *distance[i, j]* is the number of edges between
+                qubits i and j. Disconnected qubits have distance len(coupling_map)
+        """
+        if self._distance is None:
+            self._shortest_paths()
+        return self._distance
+
+    @property
+    def next_hop(self):
+        """
+        Returns:
+            numpy.ndarray: the next-hop matrix, where *next_hop[i, j]* is the neighbor of i
+                on a shortest path from i to j. Disconnected qubits have next hop -1
+        """
+        if self._next_hop is None:
+            self._shortest_paths()
+        return self._next_hop
+
+    def _shortest_paths(self):
+        """Computes the distance matrix and the next-hop matrix with a breadth-first search
+        from every physical qubit.
+        """
+        distance = np.full((self._n_qubits, self._n_qubits), len(self), dtype=np.int32)
+        next_hop = np.full((self._n_qubits, self._n_qubits), -1, dtype=np.int32)
+        for target in self._undirected_map:
+            distance[target, target] = 0
+            next_hop[target, target] = target
+            queue = deque([target])
+            while queue:
+                q = queue.popleft()
+                for n in self._undirected_map[q]:
+                    if next_hop[n, target] == -1:
+                        distance[n, target] = distance[q, target] + 1
+                        next_hop[n, target] = q
+                        queue.append(n)
+        self._distance = distance
+        self._next_hop = next_hop
+
+    def shortest_path(self, source, target):
+        """Returns a shortest path between two physical qubits.
+
+        Args:
+            source (int): the starting physical qubit
+            target (int): the physical qubit to reach
+
+        Returns:
+            list: the path of physical qubits from source to target, empty if they are not connected
+        """
+        next_hop = self.next_hop
+        path = [source]
+        while path[-1] != target:
+            q = int(next_hop[path[-1], target])
+            if q == -1:
+                return []
+            path.append(q)
+        return path
+
+    def longest_path(self, time_limit=None):
+        """Searches for the longest simple path in the coupling map with a branch-and-bound search.
+        A branch is pruned when the qubits still reachable from its last qubit can not make it longer than
+        the best path found. The result is cached, a complete search is reused for any time limit.
+
+        Args:
+            time_limit (float): the maximum time of the search in seconds, None for no limit
+
+        Returns:
+            tuple: the longest path found as a list of physical qubits and True if the search was completed,
+                False if it was stopped by the time limit
+        """
+        if None in self._longest_paths:
+            return self._longest_paths[None]
+        if time_limit in self._longest_paths:
+            return self._longest_paths[time_limit]
+        start_time = perf_counter()
+        n_qubits = len(self._undirected_map)
+        best = list()
+        complete = True
+        iterations = 0
+        # paths are most likely to start from the least connected qubits
+        for start in sorted(self._undirected_map, key=lambda q: (len(self._undirected_map[q]), q)):
+            path = [start]
+            visited = 1 << start
+            stack = [self._path_candidates(start, visited)]
+            if len(best) == 0:
+                best = [start]
+            while stack and complete:
+                iterations += 1
+                if time_limit is not None and iterations % 1024 == 0 and perf_counter() - start_time > time_limit:
+                    complete = False
+                    break
+                if len(stack[-1]) == 0:
+                    stack.pop()
+                    visited &= ~(1 << path.pop())
+                    continue
+                q = stack[-1].pop()
+                path.append(q)
+                visited |= 1 << q
+                if len(path) > len(best):
+                    best = list(path)
+                    if len(best) == n_qubits:
+                        break
+                if len(path) + self._reachable(q, visited) > len(best):
+                    stack.append(self._path_candidates(q, visited))
+                else:
+                    path.pop()
+                    visited &= ~(1 << q)
+            if len(best) == n_qubits or not complete:
+                break
+        self._longest_paths[time_limit if not complete else None] = (best, complete)
+        return best, complete
+
+    def _path_candidates(self, q, visited):
+        """Returns the unvisited neighbors of q, the ones with less unvisited neighbors last.
+
+        Args:
+            q (int): a physical qubit
+            visited (int): the bitset of the visited qubits
+
+        Returns:
+            list: the unvisited neighbors of q
+        """
+        candidates = [n for n in self._undirected_map[q] if not (visited >> n) & 1]
+        return sorted(candidates, key=lambda n: (-bin(self._adjacency[n] & ~visited).count('1'), -n))
+
+    def _reachable(self, q, visited):
+        """Counts the unvisited qubits reachable from q without passing through visited qubits.
+
+        Args:
+            q (int): a physical qubit
+            visited (int): the bitset of the visited qubits
+
+        Returns:
+            int: the number of reachable qubits
+        """
+        seen = 0
+        frontier = 1 << q
+        while frontier:
+            reached = 0
+            while frontier:
+                low = frontier & -frontier
+                reached |= self._adjacency[low.bit_length() - 1]
+                frontier ^= low
+            frontier = reached & ~visited & ~seen
+            seen |= frontier
+        return bin(seen).count('1')
+
+    def chain_positions(self, chain):
+        """Returns the index of every physical qubit in a chain of physical qubits.
+
+        Args:
+            chain (list): a sequence of physical qubits
+
+        Returns:
+            list: a list where at index q there is the position of physical qubit q in the chain,
+                -1 if q is not in the chain
+        """
+        key = tuple(chain)
+        if key in self._chain_positions:
+            self._chain_positions.move_to_end(key)
+        else:
+            positions = [-1] * self._n_qubits
+            for i, q in enumerate(chain):
+                if positions[q] == -1:
+                    positions[q] = i
+            self._chain_positions[key] = positions
+            while len(self._chain_positions) > CHAIN_POSITIONS_CACHE_SIZE:
+                self._chain_positions.popitem(last=False)
+        return self._chain_positions[key]
+
+
+def _remember(key, coupling_map):
+    _coupling_maps[key] = coupling_map
+    while len(_coupling_maps) > COUPLING_MAP_CACHE_SIZE:
+        _coupling_maps.popitem(last=False)
+
+
+def normalized_edges(edges):
+    """Returns a representation of a list of edges independent from their order and repetitions.
+
+    Args:
+        edges (list): a list of tuples (q1, q2)
+
+    Returns:
+        tuple: the sorted tuple of distinct edges
+    """
+    return tuple(sorted(set((int(edge[0]), int(edge[1])) for edge in edges)))
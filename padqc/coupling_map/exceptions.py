@@ -0,0 +1,10 @@
+class CouplingMapError(Exception):
+
+    def __init__(self, *msg):
+        """Set the error message."""
+        super().__init__(*msg)
+        self.msg = ' '.join(msg)
+
+    def __str__(self):
+        """Return the message."""
+        return repr(self.msg)
\ No newline at end of file
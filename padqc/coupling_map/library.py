@@ -0,0 +1,128 @@
+from .coupling_map import CouplingMap
+from .exceptions import CouplingMapError
+
+# coupling maps of IBM devices, as in the configuration of the Qiskit 0.21 mock backends
+
+MELBOURNE = [(1, 0), (1, 2), (2, 3), (4, 3), (4, 10), (5, 4), (5, 6), (5, 9), (6, 8), (7, 8), (9, 8), (9, 10),
+             (11, 3), (11, 10), (11, 12), (12, 2), (13, 1), (13, 12)]
+
+TOKYO = [(0, 1), (0, 5), (1, 0), (1, 2), (1, 6), (1, 7), (2, 1), (2, 6), (3, 8), (4, 8), (4, 9), (5, 0), (5, 6),
+         (5, 10), (5, 11), (6, 1), (6, 2), (6, 5), (6, 7), (6, 10), (6, 11), (7, 1), (7, 6), (7, 8), (7, 12),
+         (8, 3), (8, 4), (8, 7), (8, 9), (8, 12), (8, 13), (9, 4), (9, 8), (10, 5), (10, 6), (10, 11), (10, 15),
+         (11, 5), (11, 6), (11, 10), (11, 12), (11, 16), (11, 17), (12, 7), (12, 8), (12, 11), (12, 13), (12, 16),
+         (13, 8), (13, 12), (13, 14), (13, 18), (13, 19), (14, 13), (14, 18), (14, 19), (15, 10), (15, 16),
+         (16, 11), (16, 12), (16, 15), (16, 17), (17, 11), (17, 16), (17, 18), (18, 13), (18, 14), (18, 17),
+         (19, 13), (19, 14)]
+
+ALMADEN = [(0, 1), (1, 0), (1, 2), (1, 6), (2, 1), (2, 3), (3, 2), (3, 4), (3, 8), (4, 3), (5, 6), (5, 10), (6, 1),
+           (6, 5), (6, 7), (7, 6), (7, 8), (7, 12), (8, 3), (8, 7), (8, 9), (9, 8), (9, 14), (10, 5), (10, 11),
+           (11, 10), (11, 12), (11, 16), (12, 7), (12, 11), (12, 13), (13, 12), (13, 14), (13, 18), (14, 9),
+           (14, 13), (15, 16), (16, 11), (16, 15), (16, 17), (17, 16), (17, 18), (18, 13), (18, 17), (18, 19),
+           (19, 18)]
+
+ROCHESTER = [(0, 1), (0, 5), (1, 0), (1, 2), (2, 1), (2, 3), (3, 2), (3, 4), (4, 3), (4, 6), (5, 0), (5, 9), (6, 4),
+             (6, 13), (7, 8), (7, 16), (8, 7), (8, 9), (9, 5), (9, 8), (9, 10), (10, 9), (10, 11), (11, 10),
+             (11, 12), (11, 17), (12, 11), (12, 13), (13, 6), (13, 12), (13, 14), (14, 13), (14, 15), (15, 14),
+             (15, 18), (16, 7), (16, 19), (17, 11), (17, 23), (18, 15), (18, 27), (19, 16), (19, 20), (20, 19),
+             (20, 21), (21, 20), (21, 22), (21, 28), (22, 21), (22, 23), (23, 17), (23, 22), (23, 24), (24, 23),
+             (24, 25), (25, 24), (25, 26), (25, 29), (26, 25), (26, 27), (27, 18), (27, 26), (28, 21), (28, 32),
+             (29, 25), (29, 36), (30, 31), (30, 39), (31, 30), (31, 32), (32, 28), (32, 31), (32, 33), (33, 32),
+             (33, 34), (34, 33), (34, 35), (34, 40), (35, 34), (35, 36), (36, 29), (36, 35), (36, 37), (37, 36),
+             (37, 38), (38, 37), (38, 41), (39, 30), (39, 42), (40, 34), (40, 46), (41, 38), (41, 50), (42, 39),
+             (42, 43), (43, 42), (43, 44), (44, 43), (44, 45), (44, 51), (45, 44), (45, 46), (46, 40), (46, 45),
+             (46, 47), (47, 46), (47, 48), (48, 47), (48, 49), (48, 52), (49, 48), (49, 50), (50, 41), (50, 49),
+             (51, 44), (52, 48)]
+
+DEVICES = {'melbourne': MELBOURNE, 'tokyo': TOKYO, 'almaden': ALMADEN, 'rochester': ROCHESTER}
+
+
+def device(name):
+    """Returns the coupling map of a bundled device.
+
+    Args:
+        name (str): the device name, one of melbourne, tokyo, almaden and rochester
+
+    Returns:
+        CouplingMap: the coupling map of the device
+    """
+    if name not in DEVICES:
+        raise CouplingMapError('Unknown device %s, available devices are: %s' % (name, ', '.join(DEVICES)))
+    return CouplingMap.from_edges(DEVICES[name])
+
+
+def bidirectional(edges):
+    """Returns the edges in both directions, as for a device where every CNOT can be inverted.
+
+    Args:
+        edges (list): a list of tuples (q1, q2)
+
+    Returns:
+        list: the list of tuples (q1, q2) and (q2, q1)
+    """
+    return [edge for q1, q2 in edges for edge in ((q1, q2), (q2, q1))]
+
+
+def line(n_qubits):
+    """
+    Args:
+        n_qubits (int): the number of qubits, at least 2
+
+    Returns:
+        list: the edges of a line of n_qubits qubits, in both directions
+    """
+    if n_qubits < 2:
+        raise CouplingMapError('A line needs at least 2 qubits.')
+    return bidirectional([(q, q + 1) for q in range(n_qubits - 1)])
+
+
+def ring(n_qubits):
+    """
+    Args:
+        n_qubits (int): the number of qubits, at least 3
+
+    Returns:
+        list: the edges of a ring of n_qubits qubits, in both directions
+    """
+    if n_qubits < 3:
+        raise CouplingMapError('A ring needs at least 3 qubits.')
+    return bidirectional([(q, (q + 1) % n_qubits) for q in range(n_qubits)])
+
+
+def grid(rows, cols):
+    """
+    Args:
+        rows (int): the number of rows
+        cols (int): the number of columns
+
+    Returns:
+        list: the edges of a rows x cols grid, where qubit r * cols + c is in row r and column c,
+            in both directions
+    """
+    if rows * cols < 2:
+        raise CouplingMapError('A grid needs at least 2 qubits.')
+    edges = [(r * cols + c, r * cols + c + 1) for r in range(rows) for c in range(cols - 1)]
+    edges.extend((r * cols + c, (r + 1) * cols + c) for r in range(rows - 1) for c in range(cols))
+    return bidirectional(edges)
+
+
+def heavy_hex(rows, cols):
+    """Heavy-hexagon lattice like the one of IBM devices: rows of qubits where consecutive rows are linked
+    by a bridge qubit every 4 columns, starting from column 0 and from column 2 alternately.
+
+    Args:
+        rows (int): the number of rows
+        cols (int): the number of qubits in a row, at least 3
+
+    Returns:
+        list: the edges of the lattice, in both directions. Qubit r * cols + c is in row r and column c,
+            bridge qubits follow the rows
+    """
+    if rows < 1 or cols < 3:
+        raise CouplingMapError('A heavy-hex lattice needs at least one row of 3 qubits.')
+    edges = [(r * cols + c, r * cols + c + 1) for r in range(rows) for c in range(cols - 1)]
+    bridge = rows * cols
+    for r in range(rows - 1):
+        for c in range(0 if r % 2 == 0 else 2, cols, 4):
+            edges.extend([(r * cols + c, bridge), (bridge, (r + 1) * cols + c)])
+            bridge += 1
+    return bidirectional(edges)
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from copy import deepcopy
+from copy import copy, deepcopy
 
 from .exceptions import GateError
 
@@ -21,6 +21,29 @@ class Gate:
     def name(self):
         return self._name
 
+    def remap(self, mapping):
+        """Returns a shallow copy of the gate acting on different qubits,
+        every other attribute is shared with the original gate.
+
+        Args:
+            mapping (dict): a dictionary {q_arg: new_q_arg, ...}, qubits that are not
+                in the dictionary are left unchanged
+
+        Returns:
+            Gate: the remapped gate
+        """
+        gate = copy(self)
+        gate._remap(mapping)
+        return gate
+
+    def _remap(self, mapping):
+        """Replaces in place the quantum arguments of the gate, called on a copy by *remap()*.
+
+        Args:
+            mapping (dict): a dictionary {q_arg: new_q_arg, ...}
+        """
+        pass
+
     @property
     @abstractmethod
     def data(self):
@@ -51,6 +74,9 @@ class Input(Gate):
     def q_args(self):
         return [self._q_arg]
 
+    def _remap(self, mapping):
+        self._q_arg = mapping.get(self._q_arg, self._q_arg)
+
     @property
     def data(self):
         return {'name': self.name, 'q_arg': self.q_args}
@@ -76,6 +102,9 @@ class Output(Gate):
     def q_args(self):
         return [self._q_arg]
 
+    def _remap(self, mapping):
+        self._q_arg = mapping.get(self._q_arg, self._q_arg)
+
     @property
     def data(self):
         return {'name': self.name, 'q_arg': self.q_args}
@@ -128,6 +157,9 @@ class SingleQGate(Gate):
     def q_args(self, q_arg):
         self._q_arg = q_arg
 
+    def _remap(self, mapping):
+        self._q_arg = mapping.get(self._q_arg, self._q_arg)
+
     @property
     def data(self):
         return {'name': self.name, 'q_args': [self.q_args]}
@@ -156,6 +188,9 @@ class TwoQGate(Gate):
     def q_args(self):
         return self._q_args
 
+    def _remap(self, mapping):
+        self._q_args = [mapping.get(q_arg, q_arg) for q_arg in self._q_args]
+
     @property
     def data(self):
         return {'name': self.name, 'q_args': self.q_args}
@@ -184,6 +219,9 @@ class Barrier(Gate):
     def q_args(self, q_args):
         self._q_args = q_args
 
+    def _remap(self, mapping):
+        self._q_args = [mapping.get(q_arg, q_arg) for q_arg in self._q_args]
+
     @property
     def data(self):
         return {'name': self.name, 'q_args': self.q_args}
@@ -425,6 +463,9 @@ class DummyGate(Gate):
     def params(self, params):
         self._params = params
 
+    def _remap(self, mapping):
+        self._q_args = [mapping.get(q_arg, q_arg) for q_arg in self._q_args]
+
     @property
     def data(self):
         return {'name': self.name, 'q_args': self.q_args, 'c_args': self.c_args, 'params': self.params}
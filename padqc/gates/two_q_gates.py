@@ -23,9 +23,27 @@ class Cx(TwoQGate):
     def target(self):
         return self._target
 
+    def _remap(self, mapping):
+        super()._remap(mapping)
+        self._control, self._target = self._q_args
+
     @property
     def data(self):
         data = super().data
         data['control'] = self.control
         data['target'] = self.target
         return data
+
+
+class Swap(TwoQGate):
+    """
+    The SWAP gate, decomposed in three CNOTs by the Decompose step.
+    The CNOTs of the decomposition are oriented as cx(a, b), cx(b, a), cx(a, b).
+    """
+    def __init__(self, a, b):
+        """
+        Args:
+            a (tuple): (q_reg_id, q_reg_index)
+            b (tuple): (q_reg_id, q_reg_index)
+        """
+        super().__init__('swap', [a, b])
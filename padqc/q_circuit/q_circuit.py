@@ -162,6 +162,15 @@ class QCircuit:
         """
         self.q_graph.cx(self._layout[control], self._layout[target])
 
+    def swap(self, a, b):
+        """Applies a SWAP gate between *a* and *b* logical qubits.
+
+        Args:
+            a (tuple): a logical qubit
+            b (tuple): a logical qubit
+        """
+        self.q_graph.swap(self._layout[a], self._layout[b])
+
     def barrier(self, *q_args):
         """Applies a barrier an all logical qubits in *q_args*.
 
@@ -1,7 +1,7 @@
 import networkx as nx
 
 from padqc.gates.single_q_gates import Hadamard, Id, Rx, Pauli_X, Pauli_Y, Pauli_Z, Ry, Rz, Measure
-from padqc.gates.two_q_gates import Cx
+from padqc.gates.two_q_gates import Cx, Swap
 from padqc.gates.base_gates import Input, Output, Classic, Barrier
 from padqc.q_graph import Node
 from .exceptions import GraphError
@@ -241,6 +241,15 @@ class Graph:
         """
         self._append_node(type='gate', op=Cx(c, t))
 
+    def swap(self, a, b):
+        """Adds a SWAP gate between *a* and *b* logical qubits to the graph.
+
+        Args:
+            a (tuple): a logical qubit (q_reg_id, q_reg_index)
+            b (tuple): a logical qubit (q_reg_id, q_reg_index)
+        """
+        self._append_node(type='gate', op=Swap(a, b))
+
     def barrier(self, *q_args):
         """Adds a barrier an all logical qubits in *q_args* to the graph.
 
@@ -296,9 +305,23 @@ class Graph:
             self.graph.remove_node(q_graph._out_qubit[register])
         self.graph.remove_node(node)
 
-    def depth(self):
-        depth = nx.dag_longest_path_length(self.graph) - 1
-        return depth if depth != -1 else 0
+    def depth(self, swap_depth=1):
+        """
+        Args:
+            swap_depth (int): the depth of a SWAP gate, 3 to count SWAPs as their decomposition in CNOTs
+
+        Returns:
+            int: the depth of the circuit
+        """
+        if swap_depth == 1:
+            depth = nx.dag_longest_path_length(self.graph) - 1
+            return depth if depth != -1 else 0
+        longest = dict()
+        for node in nx.topological_sort(self.graph):
+            weight = swap_depth if isinstance(node.gate, Swap) else 1
+            longest[node] = max((longest[pred] for pred in self.graph.predecessors(node)), default=0) + weight
+        # input and output nodes are not counted
+        return max(max(longest.values(), default=2) - 2, 0)
 
     def layers(self):
         graph_layers = self.multigraph_layers()
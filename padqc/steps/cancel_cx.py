@@ -5,7 +5,7 @@ from padqc.steps import CancellationStep
 
 class CancelCx(CancellationStep):
     """
-    Cancellation step to cancel double CNOT gates.
+    Cancellation step to cancel double CNOT gates and double SWAP gates on the same pair of qubits.
     """
     def __init__(self):
         super().__init__()
@@ -23,14 +23,15 @@ class CancelCx(CancellationStep):
         """
         q_graph = q_circuit.q_graph
         cancelled = False
-        nodes = [op for op in topological_sort(q_graph.graph) if op.name == 'cx']
+        nodes = [op for op in topological_sort(q_graph.graph) if op.name in ('cx', 'swap')]
         removed = []
         for n in nodes:
             if n not in removed:
                 succ = list(q_graph.graph.successors(n))
-                if len(succ) == 1 and succ[0].name == 'cx' and succ[0].q_args == n.q_args:
+                if len(succ) == 1 and succ[0].name == n.name and (succ[0].q_args == n.q_args or (
+                        n.name == 'swap' and set(succ[0].q_args) == set(n.q_args))):
                     d = succ[0]
-                    if d.name == 'cx':
+                    if d.name in ('cx', 'swap'):
                         succ_edges = {e[2]['name']: e[1] for e in q_graph.graph.out_edges(d, data=True)}
                         pred_edges = {e[2]['name']: e[0] for e in q_graph.graph.in_edges(n, data=True)}
                         for q in pred_edges.keys():
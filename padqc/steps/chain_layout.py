@@ -1,21 +1,110 @@
+import json
 import logging
+import os
+from collections import OrderedDict
+from copy import deepcopy
+from heapq import heapify, heappop, heappush
+from multiprocessing import Pool
 
+from networkx import topological_sort
+
+from padqc.coupling_map import CouplingMap
+from padqc.gates import Cx, Swap
+from padqc.gates.base_gates import Input, Output, Classic
+from padqc.q_circuit import QCircuit
 from padqc.steps.exceptions import StepError
 from padqc.steps.base_steps import AnalysisStep
+from padqc.steps.deterministic_swap import DeterministicSwap
+from padqc.steps.patterns import Patterns
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.CRITICAL)
 
+# maximum number of chains kept in memory
+CHAIN_CACHE_SIZE = 64
+# chains already found in this process, indexed by device and search options, least recently used first
+_chains = OrderedDict()
+
+# candidate chain data shared by the worker processes, set once per worker by init_chain_trial()
+_chain_trial_data = dict()
+
+
+def chain_trial(test_circuit, coupling_map, chain):
+    """Compiles a copy of a circuit prefix on a candidate chain with Patterns and DeterministicSwap.
+
+    Args:
+        test_circuit (q_circuit.QCircuit): the circuit prefix, it is not modified
+        coupling_map (CouplingMap): the coupling map on which to compile the circuit
+        chain (list): the candidate chain of physical qubits
+
+    Returns:
+        tuple: the depth and the CNOT count of the compiled circuit, inf if it can not be compiled on the chain
+    """
+    circuit = deepcopy(test_circuit)
+    properties = {'layout': chain, 'circuit': circuit}
+    try:
+        for step in (Patterns(coupling_map=coupling_map), DeterministicSwap(coupling_map=coupling_map, offset=0)):
+            step.properties = properties
+            step.run(circuit)
+    except StepError:
+        return float('inf'), float('inf')
+    cx_count = sum(1 if isinstance(node.gate, Cx) else 3 if isinstance(node.gate, Swap) else 0
+                   for node in circuit.q_graph.graph.nodes)
+    return circuit.q_graph.depth(swap_depth=3), cx_count
+
+
+def init_chain_trial(test_circuit, coupling_map):
+    """Stores the candidate chain data in a worker process, so that it is sent only once per worker."""
+    _chain_trial_data.update(test_circuit=test_circuit, coupling_map=coupling_map)
+
+
+def pool_chain_trial(chain):
+    """Runs *chain_trial()* in a worker process initialized by *init_chain_trial()*."""
+    return chain_trial(_chain_trial_data['test_circuit'], _chain_trial_data['coupling_map'], chain)
+
 
 class ChainLayout(AnalysisStep):
 
-    def __init__(self, coupling_map, n_qubits=None, inverse=False):
+    def __init__(self, coupling_map, n_qubits=None, inverse=False, exact=False, time_limit=10, cache_dir=None,
+                 candidates=1, processes=1, region=False):
+        """
+        Args:
+            coupling_map (list | CouplingMap): the coupling map of the device,
+                a list of tuples representing edges in the coupling map
+            n_qubits (int): the minimum number of qubits in the chain. If None, the chain has all the device qubits
+                or, on devices like heavy-hex lattices where *find_chain()* can not connect all of them,
+                as many qubits as it can connect. Defaults to None
+            inverse (bool): if set to True, the chain is reversed. It can not be set with *candidates*,
+                that tries the chains in both directions
+            exact (bool): if set to True, the chain is the longest simple path of the coupling map,
+                see *CouplingMap.longest_path()*. The greedy chain of *find_chain()* is used if the search
+                hits the time limit or if the path has less than n_qubits qubits. Defaults to False
+            time_limit (float): the time limit in seconds of the exact search, None for no limit. Defaults to 10
+            cache_dir (str): if specified, chains are also stored as JSON files in this directory and reused
+                by other processes, see *cached_chain()*. Defaults to None
+            candidates (int): if more than 1, up to *candidates* chains from different starting qubits and in both
+                directions are tried on a prefix of *properties['circuit']*, see *best_chain()*. With *region*,
+                the chains are built inside the region. Defaults to 1
+            processes (int): number of worker processes used to try the candidate chains,
+                None uses all the available CPUs. Defaults to 1
+            region (bool): if set to True and n_qubits is less than the device qubits, the chain is built inside
+                the best connected region of n_qubits qubits, see *best_region()*. Defaults to False
+        """
         super().__init__()
+        if inverse is True and candidates > 1:
+            raise StepError('Inverse chain not valid with %d candidate chains' % candidates)
         self._inverse = inverse
+        self._exact = exact
+        self._time_limit = time_limit
+        self._cache_dir = cache_dir
+        self._candidates = candidates
+        self._processes = processes
+        self._region = region
+        self.PREFIX_CXS = 4
         self._n_qubits = n_qubits
-        if isinstance(coupling_map, list):
-            self._coupling_map = coupling_map
+        if isinstance(coupling_map, (list, CouplingMap)):
+            self._coupling_map = CouplingMap.from_edges(coupling_map)
         else:
             raise StepError('Coupling map of type %s is not valid' % coupling_map.__class__)
         self._undirected_map = dict()
@@ -26,157 +115,421 @@ class ChainLayout(AnalysisStep):
         """
         self._undirected_map = self.undirected_map()
         logger.debug('Undirected map: ' + str(self._undirected_map))
-        self._chain = self.find_chain(n_qubits=self._n_qubits)
-        if self._inverse is True:
+        n_qubits = self._n_qubits
+        region = self._region is True and n_qubits is not None and n_qubits < len(self._undirected_map)
+        key = (self._coupling_map.digest, n_qubits, self._exact, self._time_limit, region)
+        self._chain = self.cached_chain(key)
+        if self._chain is None:
+            if region:
+                self._chain = self.region_chain(n_qubits)
+            elif self._exact is True:
+                self._chain = self.exact_chain(n_qubits=n_qubits)
+            if self._chain is None:
+                self._chain = self.find_chain(n_qubits=n_qubits)
+            self.store_chain(key, self._chain)
+        self._chain = list(self._chain)
+        if self._candidates > 1 and self._properties.get('circuit') is not None:
+            self._chain = self.best_chain(self.candidate_chains(self._chain, n_qubits, region=region),
+                                          self._properties['circuit'])
+        elif self._inverse is True:
             self._chain = self._chain[::-1]
         self._properties['layout'] = self._chain
         logger.info('Chain: %s' % self._chain)
 
-    def find_chain(self, n_qubits=None):
+    def best_region(self, n_qubits):
+        """Finds a connected set of n_qubits physical qubits with as many coupling map edges between them as
+        possible. A region is grown from every qubit adding the neighbor with most edges towards it, and the one
+        with most edges, then fewest qubits with a single edge, is chosen.
+
+        Args:
+            n_qubits (int): the number of qubits of the region
+
+        Returns:
+            list: the sorted physical qubits of the region
+        """
+        adjacency = self._coupling_map.adjacency
+        best, best_score = None, None
+        for seed in sorted(self._undirected_map):
+            region = 1 << seed
+            members = [seed]
+            frontier = set(self._undirected_map[seed])
+            edges = 0
+            while len(members) < n_qubits and frontier:
+                q = max(frontier, key=lambda n: (bin(adjacency[n] & region).count('1'), -n))
+                edges += bin(adjacency[q] & region).count('1')
+                region |= 1 << q
+                members.append(q)
+                frontier.remove(q)
+                frontier.update(n for n in self._undirected_map[q] if not (region >> n) & 1)
+            if len(members) < n_qubits:
+                continue
+            isolated = sum(1 for q in members if bin(adjacency[q] & region).count('1') == 1)
+            if best is None or (edges, -isolated) > best_score:
+                best, best_score = members, (edges, -isolated)
+        if best is None:
+            raise StepError('No connected region of %d qubits.' % n_qubits)
+        return sorted(best)
+
+    def region_chain(self, n_qubits):
+        """Builds a chain of n_qubits qubits inside the region found by *best_region()*,
+        running a ChainLayout step with the same search options on the coupling map of the region.
+
+        Args:
+            n_qubits (int): the number of qubits of the chain
+
+        Returns:
+            list: list of physical qubits
+        """
+        region = self.best_region(n_qubits)
+        logger.info('Region: %s' % str(region))
+        if n_qubits == 1:
+            return region
+        step = self.region_step(region)
+        step.run()
+        return [region[i] for i in step.properties['layout']]
+
+    def region_step(self, region):
+        """
+        Args:
+            region (list): the sorted physical qubits of a region
+
+        Returns:
+            ChainLayout: a ChainLayout step with the same search options on the coupling map of the region,
+                where region[i] is qubit i
+        """
+        index = {q: i for i, q in enumerate(region)}
+        edges = [(index[q1], index[q2]) for q1, q2 in self._coupling_map.edges if q1 in index and q2 in index]
+        return ChainLayout(edges, exact=self._exact, time_limit=self._time_limit, cache_dir=self._cache_dir)
+
+    def candidate_chains(self, chain, n_qubits, region=False):
+        """Generates up to *candidates* distinct chains, *chain* and the chains found by *find_chain()* starting
+        from the least connected qubits, each one in both directions.
+
+        Args:
+            chain (list): the chain found starting from qubit 0, or from the first qubit of the region
+            n_qubits (int): the minimum number of qubits in the chains, see *find_chain()*
+            region (bool): if set to True, the chains are built inside the region found by *best_region()*
+
+        Returns:
+            list: the candidate chains
+        """
+        search, qubits = self, None
+        if region is True:
+            if n_qubits == 1:
+                return [chain]
+            qubits = self.best_region(n_qubits)
+            search = self.region_step(qubits)
+            search._undirected_map = search.undirected_map()
+        undirected_map = search._undirected_map
+        candidates = list()
+        seeds = sorted((q for q in undirected_map if q != 0), key=lambda q: (len(undirected_map[q]), q))
+        seeds = iter(seeds)
+        while len(candidates) < self._candidates:
+            for candidate in (chain, chain[::-1]):
+                if candidate not in candidates and len(candidates) < self._candidates:
+                    candidates.append(candidate)
+            seed = next(seeds, None)
+            if seed is None:
+                break
+            try:
+                chain = search.find_chain(n_qubits=n_qubits, start=seed)
+            except StepError:
+                chain = candidates[0]
+                continue
+            if qubits is not None:
+                chain = [qubits[i] for i in chain]
+        return candidates
+
+    def best_chain(self, candidates, q_circuit):
+        """Compiles the first *PREFIX_CXS* * n_qubits CNOTs of *q_circuit* on every candidate chain
+        with Patterns and DeterministicSwap, optionally on a process pool.
+
+        Args:
+            candidates (list): the candidate chains
+            q_circuit (q_circuit.QCircuit): the circuit to be compiled
+
+        Returns:
+            list: the chain with the lowest depth, then CNOT count, of the compiled prefix
+        """
+        test_circuit = QCircuit()
+        for q_reg in q_circuit.q_regs:
+            test_circuit.add_q_register(q_reg, q_circuit.q_regs[q_reg][1])
+        for c_reg in q_circuit.c_regs:
+            test_circuit.add_c_register(c_reg, q_circuit.c_regs[c_reg][1])
+        n_cxs = 0
+        for node in topological_sort(q_circuit.q_graph.graph):
+            if n_cxs >= self.PREFIX_CXS * q_circuit.n_qubits:
+                break
+            if not isinstance(node.gate, (Input, Output, Classic)):
+                if isinstance(node.gate, Cx):
+                    n_cxs += 1
+                test_circuit.q_graph._append_node(type=node.type, op=node.gate)
+
+        if self._processes != 1 and len(candidates) > 1:
+            with Pool(self._processes, initializer=init_chain_trial,
+                      initargs=(test_circuit, self._coupling_map)) as pool:
+                costs = pool.map(pool_chain_trial, candidates)
+        else:
+            costs = [chain_trial(test_circuit, self._coupling_map, chain) for chain in candidates]
+        for chain, cost in zip(candidates, costs):
+            logger.debug('Chain %s with depth %s and %s CNOTs' % (str(chain), str(cost[0]), str(cost[1])))
+        # the first chain wins ties, so that a single candidate gives the chain from qubit 0
+        best = costs.index(min(costs))
+        logger.info('Best chain %d of %d' % (best, len(candidates)))
+        return candidates[best]
+
+    def cached_chain(self, key):
+        """Returns a chain already found for the same device and search options, from the in-process
+        LRU cache or from the JSON file of the device in *cache_dir*.
+
+        Args:
+            key (tuple): the tuple (device digest, n_qubits, exact, time_limit, region)
+
+        Returns:
+            list: the chain, None if it was never found
+        """
+        if key in _chains:
+            _chains.move_to_end(key)
+            return _chains[key]
+        if self._cache_dir is not None:
+            chain = self._chain_file_content(key).get(str(key[1:]))
+            if isinstance(chain, list) and all(isinstance(q, int) for q in chain):
+                self._remember(key, chain)
+                return chain
+        return None
+
+    def store_chain(self, key, chain):
+        """Stores a chain in the in-process LRU cache and in the JSON file of the device in *cache_dir*.
+
+        Args:
+            key (tuple): the tuple (device digest, n_qubits, exact, time_limit, region)
+            chain (list): the chain
+        """
+        self._remember(key, chain)
+        if self._cache_dir is not None:
+            path = self._chain_file(key)
+            chains = self._chain_file_content(key)
+            chains[str(key[1:])] = chain
+            try:
+                os.makedirs(self._cache_dir, exist_ok=True)
+                # write and rename, so that other processes never read a partial file
+                with open('%s.%d' % (path, os.getpid()), 'w') as file:
+                    json.dump(chains, file)
+                os.replace('%s.%d' % (path, os.getpid()), path)
+            except OSError as error:
+                logger.warning('Chain not stored in %s: %s' % (self._cache_dir, str(error)))
+
+    @staticmethod
+    def _remember(key, chain):
+        _chains[key] = tuple(chain)
+        _chains.move_to_end(key)
+        while len(_chains) > CHAIN_CACHE_SIZE:
+            _chains.popitem(last=False)
+
+    def _chain_file(self, key):
+        return os.path.join(self._cache_dir, 'chains_%s.json' % key[0])
+
+    def _chain_file_content(self, key):
+        # a missing, corrupt or foreign file holds no chains, and it is replaced by the next stored chain
+        try:
+            with open(self._chain_file(key)) as file:
+                chains = json.load(file)
+        except (OSError, ValueError):
+            return dict()
+        return chains if isinstance(chains, dict) else dict()
+
+    def exact_chain(self, n_qubits=None):
+        """Finds the longest sequence of physical qubits such that qubit i has a connection
+        with qubits (i-1) and (i+1) in undirected_map, with a time limited search
+
+        Args:
+            n_qubits (int): the minimum number of qubits in the chain, defaults to len(undirected_map)
+
+        Returns:
+            list: list of physical qubits, None if the search was not completed
+                or if the chain has less than n_qubits qubits
+        """
+        if n_qubits is None:
+            n_qubits = len(self._undirected_map.keys())
+        chain, complete = self._coupling_map.longest_path(self._time_limit)
+        if complete is False:
+            logger.info('Exact chain search stopped by the time limit')
+            return None
+        if len(chain) < n_qubits:
+            logger.info('Longest chain has %d qubits, %d needed' % (len(chain), n_qubits))
+            return None
+        return chain
+
+    def find_chain(self, n_qubits=None, start=0):
         """Finds a sequence of physical qubits such that qubit i has a connection
         with qubits (i-1) and (i+1) in undirected_map
 
         Args:
-            connected (list): list of physical qubits already added to the sequence
             n_qubits (int): limits the number qubits to connect to at least n_qubits,
-            defaults to len(undirected_map)
+            if None the sequence connects as many qubits as it can, all the device qubits when possible
+            start (int): the physical qubit the sequence starts from. Defaults to 0
 
         Returns:
             list: list of physical qubits
         """
         max_qubits = len(self._undirected_map.keys())
-        if n_qubits is None:
-            n_qubits = max_qubits
-        if n_qubits > max_qubits:
+        if n_qubits is not None and n_qubits > max_qubits:
             raise StepError('Number of qubits greater than device.')
 
-        current = 0
-        full_map = [current]
-        isolated = []
+        size = self._coupling_map.n_qubits
+        explored = bytearray(size)
+        n_explored = 0
+        # the first qubit not explored yet
+        first = 0
+        in_chain = bytearray(size)
+        # position of every isolated qubit in the isolated list, -1 if the qubit is not isolated
+        isolated = [-1] * size
+        n_isolated = 0
         isolated_with_data = []
-        explored = set()
-        explored.add(current)
-        to_explore = sorted(list(range(max_qubits)))
-        to_explore.remove(current)
+
+        current = start
+        full_map = [current]
+        in_chain[current] = 1
+        explored[current] = 1
+        n_explored += 1
 
         last_back_step = None
         # loop over the coupling map until all qubits no more qubits
         # can be connected to the chain
-        while len(explored) < max_qubits:
-            neighbors = []
-            no_neighbors = True
-            for n in self._undirected_map[current]:
-                if n not in explored:
-                    no_neighbors = False
-                    neighbors.append(n)
-            logger.debug('Neighbors: %s' % str(neighbors))
+        while n_explored < max_qubits:
+            neighbors = [n for n in self._undirected_map[current] if not explored[n]]
+            logger.debug('Neighbors: %s', neighbors)
             # try to select next qubit from neighbors of last connected qubit
-            if no_neighbors is False:
+            if len(neighbors) != 0:
                 if current + 1 in neighbors:
                     next = current + 1
                 else:
                     next = min(neighbors)
 
-                explored.add(next)
-                to_explore.remove(next)
+                explored[next] = 1
+                n_explored += 1
                 current = next
                 full_map.append(next)
+                in_chain[next] = 1
 
                 # check that there are still qubits to explore
-                if len(explored) < max_qubits - 1:
+                if n_explored < max_qubits - 1:
                     for n1 in self._undirected_map[next]:
-                        if n1 not in explored:
+                        if not explored[n1]:
                             to_remove = True
-                            if len(self._undirected_map[n1]) == 1 and len(explored) < max_qubits - 1:
-                                explored.add(n1)
-                                to_explore.remove(n1)
+                            if len(self._undirected_map[n1]) == 1 and n_explored < max_qubits - 1:
+                                explored[n1] = 1
+                                n_explored += 1
                                 isolated_with_data.append((next, n1))
-                                isolated.append(n1)
+                                isolated[n1] = n_isolated
+                                n_isolated += 1
                                 continue
                             # check that the selected qubit does not lead to a dead end
                             for n2 in self._undirected_map[n1]:
-                                if n2 not in explored or n2 == next:
+                                if not explored[n2] or n2 == next:
                                     to_remove = False
                             if to_remove is True:
-                                explored.add(n1)
-                                to_explore.remove(n1)
+                                explored[n1] = 1
+                                n_explored += 1
                                 isolated_with_data.append((next, n1))
-                                isolated.append(n1)
+                                isolated[n1] = n_isolated
+                                n_isolated += 1
             else:
                 # if no neighbors are found, go back the chain until a new neighbor is found
                 # and restart the loop from there
-                logger.debug('last back step: %s' % str(last_back_step))
-                if full_map[-2] != last_back_step and abs(to_explore[0] - current) < len(to_explore):
+                logger.debug('last back step: %s', last_back_step)
+                while explored[first]:
+                    first += 1
+                if full_map[-2] != last_back_step and abs(first - current) < max_qubits - n_explored:
                     isolated_with_data.append((full_map[-2], current))
-                    isolated.append(current)
-                    full_map.remove(current)
+                    isolated[current] = n_isolated
+                    n_isolated += 1
+                    full_map.pop()
+                    in_chain[current] = 0
                     current = full_map[-1]
                     last_back_step = current
                 else:
                     break
 
-            logger.debug('Full chain: %s' % str(full_map))
-            logger.debug('Explored: %s' % str(explored))
-            logger.debug('To Explore: %s' % str(to_explore))
-            logger.debug('Isolated: %s' % str(isolated_with_data))
+            logger.debug('Full chain: %s', full_map)
+            logger.debug('Isolated: %s', isolated_with_data)
 
         # check for isolated qubits
         for q in range(max_qubits):
-            if q not in explored and q not in isolated:
-                for i in isolated:
-                    if q in self._undirected_map[i]:
-                        isolated_with_data.append((i, q))
-                        isolated.append(q)
-                        explored.add(q)
-                        break
+            if not explored[q] and isolated[q] == -1:
+                # the first isolated neighbor in the order the qubits were isolated
+                isolated_neighbors = [i for i in self._undirected_map[q] if isolated[i] != -1]
+                if len(isolated_neighbors) != 0:
+                    isolated_with_data.append((min(isolated_neighbors, key=lambda i: isolated[i]), q))
+                    isolated[q] = n_isolated
+                    n_isolated += 1
+                    explored[q] = 1
                 for n in self._undirected_map[q]:
-                    if n in full_map and q not in isolated:
+                    if in_chain[n] and isolated[q] == -1:
                         isolated_with_data.append((n, q))
-                        isolated.append(q)
-                        explored.add(q)
+                        isolated[q] = n_isolated
+                        n_isolated += 1
+                        explored[q] = 1
                         break
 
-        # if the chain is not long enough, add the isolated qubits
-        remaining = n_qubits - len(full_map)
+        # if the chain is not long enough, add the isolated qubits, the chain is kept as a doubly linked list
+        remaining = (n_qubits if n_qubits is not None else max_qubits) - len(full_map)
         if remaining > 0:
             logger.debug('Checking isolated')
-        while remaining > 0:
-            for next in isolated_with_data:
-                logger.debug('Found isolated %s' % str(next))
-                if next[0] in full_map:
-                    if next[0] in isolated:
-                        logger.debug('Adding %d after %d' % (next[0], next[1]))
-                        full_map.insert(full_map.index(next[0]) + 1, next[1])
+            after = [-1] * size
+            before = [-1] * size
+            for q1, q2 in zip(full_map[:-1], full_map[1:]):
+                after[q1] = q2
+                before[q2] = q1
+            head = full_map[0]
+            # the isolated qubits next to a qubit, and the first ones that can be added to the chain
+            waiting = dict()
+            ready = list()
+            for i, (q1, q2) in enumerate(isolated_with_data):
+                if in_chain[q1]:
+                    ready.append(i)
+                else:
+                    waiting.setdefault(q1, list()).append(i)
+            heapify(ready)
+            while remaining > 0:
+                if len(ready) == 0:
+                    if n_qubits is None:
+                        break
+                    raise StepError('Chain with %d qubits not found.' % n_qubits)
+                q1, q2 = isolated_with_data[heappop(ready)]
+                logger.debug('Found isolated %s', (q1, q2))
+                if isolated[q1] != -1:
+                    logger.debug('Adding %d after %d' % (q2, q1))
+                    before[q2], after[q2] = q1, after[q1]
+                    if after[q1] != -1:
+                        before[after[q1]] = q2
+                    after[q1] = q2
+                else:
+                    logger.debug('Adding %d before %d' % (q2, q1))
+                    before[q2], after[q2] = before[q1], q1
+                    if before[q1] != -1:
+                        after[before[q1]] = q2
                     else:
-                        logger.debug('Adding %d before %d' % (next[0], next[1]))
-                        full_map.insert(full_map.index(next[0]), next[1])
-                    isolated_with_data.remove(next)
-                    remaining -= 1
-                    break
+                        head = q2
+                    before[q1] = q2
+                in_chain[q2] = 1
+                for i in waiting.pop(q2, list()):
+                    heappush(ready, i)
+                remaining -= 1
+            full_map = [head]
+            while after[full_map[-1]] != -1:
+                full_map.append(after[full_map[-1]])
         return full_map
 
     def undirected_map(self):
-        """From the coupling map, obtains a dictionary representation of the directed
-        and undirected coupling maps.
+        """From the coupling map, obtains a dictionary representation of the undirected coupling map.
 
         Example:
             coupling_map = [(0, 1), (1, 2), (1, 3)]
 
-            directed_map = {0: [1], 1: [2, 3], 2: [], 3: []}
-
             undirected_map = {0: [1], 1: [0, 2, 3], 2: [1], 3: [1]}
 
         Returns:
-            tuple: the directed map and undirected map as dictionaries
+            dict: the undirected map as a dictionary
         """
-        undirected_map = dict()
-        for edge in self._coupling_map:
-            if edge[0] not in undirected_map:
-                undirected_map.update({edge[0]: []})
-            if edge[1] not in undirected_map:
-                undirected_map.update({edge[1]: []})
-            if edge[1] not in undirected_map[edge[0]]:
-                undirected_map[edge[0]].append(edge[1])
-            if edge[0] not in undirected_map[edge[1]]:
-                undirected_map[edge[1]].append(edge[0])
-        return undirected_map
+        return self._coupling_map.undirected_map
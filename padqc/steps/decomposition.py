@@ -1,13 +1,14 @@
 from networkx import topological_sort
 
+from padqc.gates import Cx, Swap
 from padqc.gates.base_gates import CompositeGate
-from padqc.q_graph import Graph
+from padqc.q_graph import Graph, Node
 from padqc.steps import CompilingStep
 
 
 class Decompose(CompilingStep):
     """
-    Compiling step to decompose composite gates.
+    Compiling step to decompose composite gates and SWAP gates.
     """
     def __init__(self):
         super().__init__()
@@ -33,6 +34,30 @@ class Decompose(CompilingStep):
                 self._decomposed_graph(decomposed_graph, g, gate.decomposition)
             q_circuit.q_graph._node_counter = decomposed_graph._node_counter
             q_circuit.q_graph._substitute_node(node, decomposed_graph)
+        swap_nodes = [node for node in q_circuit.q_graph.graph.nodes if isinstance(node.gate, Swap)]
+        for node in swap_nodes:
+            self._decompose_swap(q_circuit.q_graph, node)
+
+    @staticmethod
+    def _decompose_swap(q_graph, node):
+        """Substitutes a SWAP node with the three CNOTs cx(a, b), cx(b, a), cx(a, b), rewiring its edges in place.
+
+        Args:
+            q_graph (q_graph.Graph): the graph containing the node
+            node (q_graph.Node): the SWAP node
+        """
+        a, b = node.gate.q_args
+        names = ['%s[%d]' % (q_graph._q_reg_id_to_name(q[0]), q[1]) for q in (a, b)]
+        cxs = [q_graph._add_node(Node(type='gate', gate=Cx(control, target)))
+               for control, target in ((a, b), (b, a), (a, b))]
+        for first, second in zip(cxs[:-1], cxs[1:]):
+            for name in names:
+                q_graph.graph.add_edge(first, second, name=name)
+        for pred, _, name in list(q_graph.graph.in_edges(node, data='name')):
+            q_graph.graph.add_edge(pred, cxs[0], name=name)
+        for _, succ, name in list(q_graph.graph.out_edges(node, data='name')):
+            q_graph.graph.add_edge(cxs[-1], succ, name=name)
+        q_graph.graph.remove_node(node)
 
     def _decomposed_graph(self, decomposed_graph, gate, decomposition):
         """Recursively decompose a composite gate and adds its gates nodes to the decomposed graph.
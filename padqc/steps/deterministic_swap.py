@@ -1,11 +1,18 @@
 import logging
+from collections import deque
+from itertools import chain
+from collections.abc import Mapping
 from copy import deepcopy
+from multiprocessing import Lock, Pool, RawValue
+from time import perf_counter
 
+import numpy as np
 from networkx import topological_sort
 
+from padqc.coupling_map import CouplingMap
 from padqc.q_circuit import QCircuit
-from padqc.gates import Cx, Rz, Ry, Rx
-from padqc.gates.single_q_gates import Measure
+from padqc.gates import Cx, Swap, Rz, Ry, Rx
+from padqc.gates.single_q_gates import Measure, Pauli_Z
 from padqc.gates.base_gates import Input, Output, Classic, Barrier, DummyGate
 from padqc.q_graph import Graph, Node
 from padqc.steps import CompilingStep, Decompose
@@ -15,43 +22,166 @@ logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.CRITICAL)
 
+# offset tuning data shared by the worker processes, set once per worker by init_offset_trial()
+_offset_trial_data = dict()
+
+
+def offset_trial(test_circuit, coupling_map, layout, offset, recursive=False, depth_bound=None):
+    """Compiles a copy of the offset tuning test circuit with a given offset.
+
+    Args:
+        test_circuit (q_circuit.QCircuit): the offset tuning test circuit, it is not modified
+        coupling_map (CouplingMap): the coupling map on which to compile the circuit
+        layout (list): the chain of physical qubits
+        offset (int): the offset to try
+        recursive (bool): the path search of DeterministicSwap
+        depth_bound (float | multiprocessing.Value): the trial is aborted as soon as
+            its depth exceeds this bound
+
+    Returns:
+        float: the depth of the compiled circuit, inf if it can not be compiled with this offset
+            or if it exceeds *depth_bound*
+    """
+    circuit = deepcopy(test_circuit)
+    test_swapper = DeterministicSwap(coupling_map=coupling_map, offset=offset, recursive=recursive,
+                                     depth_bound=depth_bound)
+    test_swapper.properties = {'layout': layout}
+    try:
+        test_swapper.run(circuit)
+    except StepError:
+        return float('inf')
+    return circuit.q_graph.depth(swap_depth=3)
+
+
+def init_offset_trial(test_circuit, coupling_map, layout, recursive, depth_bound, lock):
+    """Stores the offset tuning data in a worker process, so that it is sent only once per worker."""
+    _offset_trial_data.update(test_circuit=test_circuit, coupling_map=coupling_map, layout=layout,
+                              recursive=recursive, depth_bound=depth_bound, lock=lock)
+
+
+def pool_offset_trial(offset):
+    """Runs *offset_trial()* in a worker process initialized by *init_offset_trial()*,
+    lowering the depth bound shared by all the workers if a better depth is found.
+
+    Returns:
+        tuple: the offset and the depth of the compiled circuit
+    """
+    data = _offset_trial_data
+    depth = offset_trial(data['test_circuit'], data['coupling_map'], data['layout'], offset,
+                         data['recursive'], data['depth_bound'])
+    with data['lock']:
+        if depth < data['depth_bound'].value:
+            data['depth_bound'].value = depth
+    return offset, depth
+
+
+class LayoutView(Mapping):
+    """
+    A read-only dictionary view of the layout of a DeterministicSwap step, mapping every logical qubit
+    of the input circuit to the qubit of the output circuit it currently occupies.
+    """
+    def __init__(self, swapper):
+        """
+        Args:
+            swapper (DeterministicSwap): the step holding the layout
+        """
+        self._swapper = swapper
+
+    def __getitem__(self, reg):
+        swapper = self._swapper
+        return swapper._regs[swapper._wire_of[swapper._reg_index[reg]]]
+
+    def __iter__(self):
+        return iter(self._swapper._regs)
+
+    def __len__(self):
+        return len(self._swapper._regs)
+
+    def __repr__(self):
+        return str(dict(self))
+
 
 class DeterministicSwap(CompilingStep):
     """
     Compiling step for circuits characterized by nearest-neighbor CNOT sequences,
-    adopts a deterministic SWAP strategy when needed.
+    adopts a deterministic SWAP strategy when needed. SWAPs are added as single SWAP gates during routing
+    and decomposed in three CNOTs at the end of the step, unless *native_swaps* is set.
     """
 
     def __init__(self, coupling_map, **kwargs):
         """
         Args:
-            coupling_map (list): the coupling on which to compile the circuit,
+            coupling_map (list | CouplingMap): the coupling on which to compile the circuit,
                 a list of tuples representing edges in the coupling map
             offset (int): if the circuit needs less qubits than there are in the coupling-map
                 and offset is more than 0, DeterministicSwap will map qubits in the circuit to qubits
                 in the layout in the interval [offset : n_qubits+offset] instead of [0 : n_qubits],
                 where n_qubits is the number of qubits needed by the circuit
+            recursive (bool): if set to True, SWAP paths are found with the recursive search
+                of *from_q1_to_q2()* instead of shortest paths on the coupling map. Defaults to False
+            processes (int): number of worker processes used to try the offsets during offset tuning,
+                None uses all the available CPUs. Defaults to 1
+            depth_bound (float | multiprocessing.Value): if specified, compilation is aborted with
+                a StepError as soon as the depth of a qubit exceeds this bound. Defaults to None
+            lookahead (int): if more than 0, SWAP paths are chosen looking at the distances of the next
+                *lookahead* CNOTs, see *lookahead_path()*. Defaults to 0
+            parallel (bool): if set to True, the remote CNOTs of a layer are routed together on disjoint
+                SWAP paths before the other gates of the layer, see *parallel_cxs()*. Defaults to False
+            bridge (bool): if set to True, CNOTs between qubits with a common neighbor can be applied
+                in place with four CNOTs instead of a SWAP, see *routed_cx()*. Defaults to False
+            swap_network (bool): if set to True, blocks of commuting interactions between every pair of
+                qubits of a chain segment are routed with a SWAP network, see *route_block()*.
+                Not used in parallel mode. Defaults to False
+            native_swaps (bool): if set to True, SWAP gates are left in the compiled circuit, to be decomposed
+                by the Decompose step or at QASM export. CancelH and CancelCx can not cancel their CNOTs
+                against the neighboring ones until then. Defaults to False
         """
         super().__init__()
         self.SWAP_DEPTH = 3
-        self._coupling_map = coupling_map
+        self.LOOKAHEAD_WEIGHT = 0.5
+        self.BRIDGE_WINDOW = 10
+        if isinstance(coupling_map, (list, CouplingMap)):
+            self._coupling_map = CouplingMap.from_edges(coupling_map)
+        else:
+            raise StepError('Coupling map of type %s is not valid' % coupling_map.__class__)
         if 'offset' in kwargs:
             self._offset = kwargs['offset']
         else:
             self._offset = None
-        self._wire_to_reg = dict()
-        self._reg_to_wire = dict()
-        self._layout = dict()
-        self._depths = dict()
+        self._recursive = kwargs.get('recursive', False)
+        self._processes = kwargs.get('processes', 1)
+        self._depth_bound = kwargs.get('depth_bound', None)
+        self._lookahead = kwargs.get('lookahead', 0)
+        self._parallel = kwargs.get('parallel', False)
+        self._bridge = kwargs.get('bridge', False)
+        self._swap_network = kwargs.get('swap_network', False)
+        self._native_swaps = kwargs.get('native_swaps', False)
+        self._cxs = list()
+        self._cx_indexes = dict()
+        self._cx_index = 0
+        # logical qubits are numbered in wire order, the permutation is held by two inverse arrays:
+        # *_wire_of[i]* is the wire of logical qubit i and *_reg_at[w]* is the logical qubit on wire w
+        self._regs = list()
+        self._reg_index = dict()
+        self._wire_of = np.zeros(0, dtype=np.int64)
+        self._reg_at = np.zeros(0, dtype=np.int64)
+        self._wire_phys = np.zeros(0, dtype=np.int64)
+        self._layout = LayoutView(self)
+        self._depths = np.zeros(0, dtype=np.int64)
         self._measured = list()
         self._available = set()
         self._directed_map, self._undirected_map = self.maps_as_dict()
         logger.debug('Undirected map: ' + str(self._undirected_map))
+        self._distance, self._next_hop = self._coupling_map.distance, self._coupling_map.next_hop
+        self._positions = list()
+        self._phys_wire = np.zeros(0, dtype=np.int64)
         self._graph = Graph()
+        self.report = {'swaps': 0, 'bridges': 0, 'depth': 0, 'time': 0}
 
     def offset_tuning(self, q_circuit):
         """Compiles the first n/2 remote CNOTs in an n qubit circuit with different offset values
-        to find the best depth-wise offset.
+        to find the best depth-wise offset. Offsets are tried starting from the most connected
+        chain segments, and every trial is aborted as soon as it gets deeper than the best one found.
 
         Args:
             q_circuit (q_circuit.QCircuit): the quantum circuit for which the offset must be tuned
@@ -61,7 +191,6 @@ class DeterministicSwap(CompilingStep):
             logger.info('Offset set to 0')
             self._offset = 0
             return
-        depths = list()
         stop = q_circuit.n_qubits // 2
 
         test_circuit = QCircuit()
@@ -75,7 +204,7 @@ class DeterministicSwap(CompilingStep):
         for node in topological_sort(q_circuit.q_graph.graph):
             if n_remotes_cx > stop:
                 break
-            gate = deepcopy(node.gate)
+            gate = node.gate
             if isinstance(gate, Cx):
                 logger.debug('Cx[%s,%s]' % (str(gate.control), str(gate.target)))
                 if abs(gate.control[0] - gate.target[0]) != 0:
@@ -117,20 +246,30 @@ class DeterministicSwap(CompilingStep):
 
         logger.debug('Found %d remote cnots.' % n_remotes_cx)
 
+        offsets = list()
         for offset in range(max_offset + 1):
-            logger.debug('Trying with offset %d' % offset)
-            copy_test_cirucit = deepcopy(test_circuit)
-            test_swapper = DeterministicSwap(coupling_map=self._coupling_map, offset=offset)
-            test_swapper.properties = deepcopy(self.properties)
-            test_swapper.run(copy_test_cirucit)
-
-            depths.append(copy_test_cirucit.depth())
-            logger.debug('Offset %d with circuit depth %d' % (offset, depths[offset]))
-            best = min(depths)
-            if depths[-1] > best and (depths[-1] / best) - 1 > 0.25:
-                break
+            if self.connected(self._chain[offset:offset + q_circuit.n_qubits]):
+                offsets.append(offset)
+            else:
+                logger.debug('Offset %d not valid' % offset)
+        offsets = sorted(offsets, key=lambda x: (-self.segment_edges(x, q_circuit.n_qubits), x))
+        depths = [float('inf')] * (max_offset + 1)
+        if self._processes != 1 and len(offsets) > 1:
+            depth_bound = RawValue('d', float('inf'))
+            with Pool(self._processes, initializer=init_offset_trial,
+                      initargs=(test_circuit, self._coupling_map, self._chain, self._recursive, depth_bound,
+                                Lock())) as pool:
+                for offset, depth in pool.imap_unordered(pool_offset_trial, offsets):
+                    depths[offset] = depth
+                    logger.debug('Offset %d with circuit depth %s' % (offset, str(depth)))
+        else:
+            for offset in offsets:
+                depths[offset] = offset_trial(test_circuit, self._coupling_map, self._chain, offset,
+                                              self._recursive, min(depths))
+                logger.debug('Offset %d with circuit depth %s' % (offset, str(depths[offset])))
+        # aborted trials are deeper than the best one, so the first minimum is the same of an exhaustive search
         self._offset = depths.index(min(depths))
-        logger.info('Best offset %d with circuit depth %d' % (self._offset, depths[self._offset]))
+        logger.info('Best offset %d with circuit depth %s' % (self._offset, str(depths[self._offset])))
 
     def run(self, q_circuit):
         """Executes the compiling step on *q_circuit*.
@@ -139,7 +278,9 @@ class DeterministicSwap(CompilingStep):
             q_circuit (q_circuit.QCircuit): the circuit to be compiled
         """
 
+        start = perf_counter()
         self._chain = self._properties['layout']
+        self._positions = self._coupling_map.chain_positions(self._chain)
 
         if self._offset is None:
             logger.debug('Offset Tuning')
@@ -150,14 +291,17 @@ class DeterministicSwap(CompilingStep):
         for c_reg in q_circuit.q_graph.c_registers:
             self._graph._add_c_register(c_reg, q_circuit.q_graph.c_registers[c_reg]['dim'])
 
-        for q_reg in sorted(self._graph.q_registers.values(), key=lambda x: x['id']):
-            for i in range(q_reg['dim']):
-                self._wire_to_reg[len(self._wire_to_reg)] = (q_reg['id'], i)
-                self._reg_to_wire[(q_reg['id'], i)] = len(self._reg_to_wire)
-                self._layout[(q_reg['id'], i)] = (q_reg['id'], i)
-                self._depths[len(self._wire_to_reg) - 1] = 0
-
-        self._available = set(self._chain[self._offset:self._offset + len(self._wire_to_reg)])
+        self._regs = [(q_reg['id'], i) for q_reg in sorted(self._graph.q_registers.values(), key=lambda x: x['id'])
+                      for i in range(q_reg['dim'])]
+        self._reg_index = {reg: i for i, reg in enumerate(self._regs)}
+        self._wire_of = np.arange(len(self._regs))
+        self._reg_at = np.arange(len(self._regs))
+        self._wire_phys = np.array([self._chain[(wire + self._offset) % len(self._chain)]
+                                    for wire in range(len(self._regs))], dtype=np.int64)
+        self._phys_wire = np.array(self._positions, dtype=np.int64) - self._offset
+        self._depths = np.zeros(len(self._regs), dtype=np.int64)
+
+        self._available = set(self._chain[self._offset:self._offset + len(self._regs)])
         logger.debug(self._available)
 
         regs_to_phys_q = {(self._graph._q_reg_id_to_name(q_reg['id']), i): self.phys_q((q_reg['id'], i))
@@ -187,44 +331,204 @@ class DeterministicSwap(CompilingStep):
                         q_circuit.q_graph.graph.add_edge(pred, measure, name='%s[%d]' % (
                             self._graph._q_reg_id_to_name(q_arg[0]), q_arg[1]))
 
-        for node in topological_sort(q_circuit.q_graph.graph):
-            gate = node.gate
-            if not isinstance(gate, (Input, Output, Classic)):
-                if isinstance(gate, Cx):
-                    if self.remote_cx(gate):
-                        logger.debug('cx: %s - %s' % (str(gate.control), str(gate.target)))
-                        self.chain_swap(self.path(gate.control, gate.target))
-                    else:
-                        logger.debug('cx: %s - %s' % (str(gate.control), str(gate.target)))
-                    self.cx(gate.control, gate.target)
-                elif isinstance(gate, Measure):
-                    logger.debug('%s: %s' % (gate.name, str(gate.q_args)))
-                    new_gate = deepcopy(gate)
-                    new_gate.q_args = self._layout[gate.q_args[0]]
-                    self._measured.append(self.phys_q(gate.q_args[0]))
-                    self._graph._append_node(type=node.type, op=new_gate)
-                elif isinstance(gate, Barrier):
-                    new_gate = deepcopy(gate)
-                    q_args = [self._layout[q_arg] for q_arg in gate.q_args]
-                    new_gate.q_args = q_args
-                    self._graph._append_node(type=node.type, op=new_gate)
-                    self.update_depth(*gate.q_args)
-                else:
-                    if isinstance(gate, (Rx, Ry, Rz)):
-                        logger.debug('%s: %s %s' % (gate.name, str(gate.q_args), str(gate.theta)))
-                    else:
-                        logger.debug('%s: %s' % (gate.name, str(gate.q_args)))
-                    new_gate = deepcopy(gate)
-                    if isinstance(gate, DummyGate):
-                        new_gate.q_args = [self._layout[q_arg] for q_arg in gate.q_args]
+        if self._parallel:
+            layers = [layer for layer in q_circuit.q_graph.layers()]
+            nodes = [node for layer in layers for node in layer]
+        else:
+            nodes = list(topological_sort(q_circuit.q_graph.graph))
+        cx_nodes = [node for node in nodes if isinstance(node.gate, Cx)]
+        self._cxs = [(node.gate.control, node.gate.target) for node in cx_nodes]
+        self._cx_indexes = {node: i for i, node in enumerate(cx_nodes)}
+        if self._parallel:
+            for layer in layers:
+                remote_cxs = list()
+                others = list()
+                for node in layer:
+                    if isinstance(node.gate, Cx) and self.remote_cx(node.gate):
+                        remote_cxs.append(node)
                     else:
-                        new_gate.q_args = self._layout[gate.q_args[0]]
-                    self._graph._append_node(type=node.type, op=new_gate)
-                    self.update_depth(gate.q_args[0])
-        q_circuit._layout = self._layout
+                        others.append(node)
+                # the SWAPs come first, and they do not move the qubits of the other CNOTs of the layer
+                self.parallel_cxs(remote_cxs, {self.phys_q(q) for node in others if isinstance(node.gate, Cx)
+                                               for q in node.gate.q_args})
+                for node in others:
+                    self.route_node(node)
+        elif self._swap_network:
+            units = self.interaction_units(q_circuit.q_graph, nodes)
+            block = list()
+            block_qubits = set()
+            for node in nodes:
+                if node in units:
+                    if node is units[node][0]:
+                        block.append(units[node])
+                        block_qubits.update(node.gate.q_args)
+                    continue
+                # a gate on the qubits of the block can not be moved across it
+                if not isinstance(node.gate, (Input, Output, Classic)) and block_qubits.intersection(node.q_args):
+                    self.route_block(block)
+                    block = list()
+                    block_qubits = set()
+                self.route_node(node)
+            self.route_block(block)
+        else:
+            for node in nodes:
+                self.route_node(node)
+        q_circuit._layout = dict(self._layout)
         q_circuit.q_graph = self._graph
+        if not self._native_swaps:
+            Decompose().run(q_circuit)
+        # the depth of the decomposed circuit, as tracked by update_depth() and bounded by depth_bound
+        self.report['depth'] = q_circuit.q_graph.depth(swap_depth=3)
+        self.report['time'] = perf_counter() - start
+        logger.info('SWAP count %d, bridge count %d, depth %d, compile time %.3fs'
+                    % (self.report['swaps'], self.report['bridges'], self.report['depth'], self.report['time']))
+        self._properties['swap_report'] = self.report
         logger.info('Layout: %s' % str(q_circuit.properties['layout']))
 
+    def route_node(self, node):
+        """Maps a node of the input circuit on the output circuit, routing its CNOT if it is remote.
+
+        Args:
+            node (q_graph.Node): the node to map
+        """
+        gate = node.gate
+        if not isinstance(gate, (Input, Output, Classic)):
+            if isinstance(gate, Cx):
+                self._cx_index = self._cx_indexes[node]
+                logger.debug('cx: %s - %s' % (str(gate.control), str(gate.target)))
+                if self.remote_cx(gate):
+                    self.routed_cx(gate.control, gate.target, self.path(gate.control, gate.target))
+                else:
+                    self.cx(gate.control, gate.target)
+            elif isinstance(gate, Measure):
+                logger.debug('%s: %s' % (gate.name, str(gate.q_args)))
+                new_gate = gate.remap(self._layout)
+                self._measured.append(self.phys_q(gate.q_args[0]))
+                self._graph._append_node(type=node.type, op=new_gate)
+            elif isinstance(gate, Barrier):
+                new_gate = gate.remap(self._layout)
+                self._graph._append_node(type=node.type, op=new_gate)
+                self.update_depth(*gate.q_args)
+            else:
+                if isinstance(gate, (Rx, Ry, Rz)):
+                    logger.debug('%s: %s %s' % (gate.name, str(gate.q_args), str(gate.theta)))
+                else:
+                    logger.debug('%s: %s' % (gate.name, str(gate.q_args)))
+                new_gate = gate.remap(self._layout)
+                self._graph._append_node(type=node.type, op=new_gate)
+                self.update_depth(gate.q_args[0])
+
+    def interaction_units(self, q_graph, nodes):
+        """Finds the two-qubit diagonal interactions cx(a, b), diagonal gate on b, cx(a, b),
+        like the ZZ interactions of QAOA circuits. Any two of them commute.
+
+        Args:
+            q_graph (q_graph.Graph): the graph of the circuit
+            nodes (list): the nodes of the graph in topological order
+
+        Returns:
+            dict: a dictionary mapping every node of an interaction to the interaction, a tuple of three nodes
+        """
+        units = dict()
+        for node in nodes:
+            if not isinstance(node.gate, Cx) or node in units:
+                continue
+            successors = set(q_graph.graph.successors(node))
+            for mid in successors:
+                if mid.q_args == [node.gate.target] and self.diagonal(mid.gate):
+                    last = list(q_graph.graph.successors(mid))
+                    if len(successors) == 2 and len(last) == 1 and last[0] in successors and \
+                            isinstance(last[0].gate, Cx) and last[0].q_args == node.q_args:
+                        unit = (node, mid, last[0])
+                        for n in unit:
+                            units[n] = unit
+        return units
+
+    @staticmethod
+    def diagonal(gate):
+        """Checks if a single qubit gate is diagonal, i.e. a rotation around the Z axis.
+
+        Args:
+            gate (gates.Gate): the gate
+
+        Returns:
+            bool: True if the gate is diagonal, False otherwise
+        """
+        if isinstance(gate, (Rz, Pauli_Z)):
+            return True
+        return isinstance(gate, DummyGate) and (gate.name == 'u1' or gate.name == 'u3' and gate.params[0] == 0)
+
+    def route_block(self, block):
+        """Routes a block of commuting interactions found by *interaction_units()*. If they interact every pair
+        of qubits on a chain segment, they are applied with an odd-even transposition SWAP network, executing every
+        interaction when its qubits become adjacent, otherwise they are routed one at a time.
+
+        Args:
+            block (list): the interactions of the block
+        """
+        qubits = {q for unit in block for q in unit[0].q_args}
+        pairs = {frozenset(unit[0].q_args) for unit in block}
+        n = len(qubits)
+        wires = sorted(self.wire(q) for q in qubits)
+        if n < 3 or len(pairs) != n * (n - 1) // 2 or wires[-1] - wires[0] + 1 != n or not all(
+                self._coupling_map.adjacent(int(self._wire_phys[w]), int(self._wire_phys[w + 1])) for w in wires[:-1]):
+            for unit in block:
+                for node in unit:
+                    self.route_node(node)
+            return
+        logger.debug('Swap network on wires %d-%d' % (wires[0], wires[-1]))
+        pending = dict()
+        for unit in block:
+            pending.setdefault(frozenset(unit[0].q_args), list()).append(unit)
+        # n rounds of odd-even transpositions make every pair of qubits adjacent once
+        for r in range(n):
+            for w in range(wires[0] + r % 2, wires[-1], 2):
+                for unit in pending.pop(frozenset((self.reg(w), self.reg(w + 1))), list()):
+                    for node in unit:
+                        self.route_node(node)
+                if len(pending) == 0:
+                    return
+                self.chain_swap([w, w + 1])
+
+    def parallel_cxs(self, nodes, busy=()):
+        """Routes the remote CNOTs of a layer together, choosing SWAP paths that do not share
+        physical qubits so that their SWAPs can be executed in parallel. Paths are chosen from
+        the closest CNOT, a CNOT whose disjoint paths are all longer than a shortest path, or with none,
+        is routed after the others.
+
+        Args:
+            nodes (list): the nodes of the remote CNOTs of a layer
+            busy (set): physical qubits left out of the paths, as the ones of the adjacent CNOTs of the layer
+        """
+        nodes = sorted(nodes, key=lambda node: self._distance[self.phys_q(node.gate.control),
+                                                              self.phys_q(node.gate.target)])
+        reserved = {self.phys_q(q) for node in nodes for q in node.gate.q_args}.union(busy)
+        available = self._available
+        paths = list()
+        deferred = list()
+        for node in nodes:
+            gate = node.gate
+            self._cx_index = self._cx_indexes[node]
+            self._available = available.difference(reserved).union(self.phys_q(q) for q in gate.q_args)
+            try:
+                path = self.path(gate.control, gate.target)
+            except StepError:
+                deferred.append(node)
+                continue
+            finally:
+                self._available = available
+            if len(path) > self._distance[self.phys_q(gate.control), self.phys_q(gate.target)]:
+                deferred.append(node)
+                continue
+            reserved.update(int(q) for q in self._wire_phys[path])
+            paths.append((node, path))
+        for node, path in paths:
+            self._cx_index = self._cx_indexes[node]
+            logger.debug('cx: %s - %s' % (str(node.gate.control), str(node.gate.target)))
+            self.routed_cx(node.gate.control, node.gate.target, path)
+        for node in deferred:
+            self.route_node(node)
+
     def cx(self, control, target):
         """Applies a CNOT or an inverted CNOT between control and target logical qubits,
         according to the coupling map.
@@ -233,11 +537,70 @@ class DeterministicSwap(CompilingStep):
             control (tuple): control logical qubit (q_reg_id, q_reg_index)
             target (tuple): target logical qubit (c_reg_id, c_reg_index)
         """
-        if self.phys_q(target) not in self._undirected_map[self.phys_q(control)]:
+        if not self._coupling_map.adjacent(self.phys_q(control), self.phys_q(target)):
             raise StepError('CX between %s-%s not valid' % (str(self._layout[control]), str(self._layout[target])))
         self._graph._append_node(type='gate', op=Cx(self._layout[control], self._layout[target]))
         self.update_depth(control, target)
 
+    def routed_cx(self, control, target, path):
+        """Applies a remote CNOT after the SWAPs along *path*. In bridge mode, if the path is a single SWAP
+        through a common neighbor of control and target, the CNOT is applied in place with *bridge()*
+        when the SWAP would not bring closer the next CNOTs on the same qubits.
+
+        Args:
+            control (tuple): control logical qubit (q_reg_id, q_reg_index)
+            target (tuple): target logical qubit (q_reg_id, q_reg_index)
+            path (list): path of wires from control to target or from target to control
+        """
+        if self._bridge and len(path) == 2 and path[0] in (self.wire(control), self.wire(target)):
+            mid = self.reg(path[1])
+            if self._coupling_map.adjacent(self.phys_q(control), self.phys_q(mid)) and \
+                    self._coupling_map.adjacent(self.phys_q(mid), self.phys_q(target)):
+                involved = {control, target, mid}
+                next_cxs = [cx for cx in self._cxs[self._cx_index + 1:self._cx_index + 1 + self.BRIDGE_WINDOW]
+                            if involved.intersection(cx)]
+                if self.cxs_distance(next_cxs, path) >= self.cxs_distance(next_cxs):
+                    self.bridge(control, target, mid)
+                    return
+        self.chain_swap(path)
+        self.cx(control, target)
+
+    def bridge(self, control, target, mid):
+        """Applies a CNOT between control and target logical qubits through their common neighbor *mid*,
+        with the four CNOTs cx(control, mid), cx(mid, target), cx(control, mid), cx(mid, target).
+        The state of *mid* and the layout are left unchanged.
+
+        Args:
+            control (tuple): control logical qubit (q_reg_id, q_reg_index)
+            target (tuple): target logical qubit (q_reg_id, q_reg_index)
+            mid (tuple): logical qubit on the common neighbor (q_reg_id, q_reg_index)
+        """
+        logger.debug('Bridge: %s-%s-%s' % (str(control), str(mid), str(target)))
+        self.report['bridges'] += 1
+        for _ in range(2):
+            self.cx(control, mid)
+            self.cx(mid, target)
+
+    def swap(self, a, b):
+        """Applies a SWAP between logical qubits *a* and *b*. Its arguments are ordered following
+        the direction of the coupling map, so that two of the three CNOTs of its decomposition are native.
+
+        Args:
+            a (tuple): logical qubit (q_reg_id, q_reg_index)
+            b (tuple): logical qubit (q_reg_id, q_reg_index)
+        """
+        if not self._coupling_map.adjacent(self.phys_q(a), self.phys_q(b)):
+            raise StepError('SWAP between %s-%s not valid' % (str(self._layout[a]), str(self._layout[b])))
+        if self.phys_q(b) in self._directed_map[self.phys_q(a)] or \
+                self.phys_q(a) not in self._directed_map[self.phys_q(b)]:
+            self._graph._append_node(type='gate', op=Swap(self._layout[a], self._layout[b]))
+        else:
+            self._graph._append_node(type='gate', op=Swap(self._layout[b], self._layout[a]))
+        # the depth of the three CNOTs of the decomposition, SWAP_DEPTH is a routing cost that also
+        # counts the Hadamard gates inverting a CNOT on directed coupling maps
+        for _ in range(3):
+            self.update_depth(a, b)
+
     def remote_cx(self, cx):
         """Cheks if a CNOT is remote.
 
@@ -247,7 +610,7 @@ class DeterministicSwap(CompilingStep):
         Returns:
             bool: True if the CNOT is remote, False otherwise
         """
-        if self.phys_q(cx.target) in self._undirected_map[self.phys_q(cx.control)]:
+        if self._coupling_map.adjacent(self.phys_q(cx.control), self.phys_q(cx.target)):
             return False
         else:
             return True
@@ -261,7 +624,7 @@ class DeterministicSwap(CompilingStep):
         Returns:
             int: the wire
         """
-        return self._reg_to_wire[reg]
+        return int(self._wire_of[self._reg_index[reg]])
 
     def reg(self, wire):
         """Returns the logical qubit of a circuit wire.
@@ -272,7 +635,7 @@ class DeterministicSwap(CompilingStep):
         Returns:
             tuple: the logical qubit (q_reg_id, q_reg_index)
         """
-        return self._wire_to_reg[wire]
+        return self._regs[self._reg_at[wire]]
 
     def phys_q(self, reg):
         """Returns the physical qubit of a logical qubit.
@@ -283,7 +646,7 @@ class DeterministicSwap(CompilingStep):
         Returns:
             int: the physical qubit
         """
-        return self._chain[(self.wire(reg) + self._offset) % len(self._chain)]
+        return int(self._wire_phys[self._wire_of[self._reg_index[reg]]])
 
     def update_depth(self, *args):
         """Increments depth of qubits in *args, if more than one qubit is specified
@@ -294,11 +657,14 @@ class DeterministicSwap(CompilingStep):
             *args (): variable length logical qubits list
         """
         max_depth = max((self._depths[self.wire(q)] for q in args)) + 1
+        if self._depth_bound is not None and max_depth > getattr(self._depth_bound, 'value', self._depth_bound):
+            raise StepError('Depth bound exceeded')
         for q in args:
             self._depths[self.wire(q)] = max_depth
 
     def path(self, control, target):
-        """Finds path from control to target logical qubits using *bring_closer()* function
+        """Finds path from control to target logical qubits using *bring_closer()* function,
+        or *lookahead_path()* in lookahead mode
 
         Args:
             control (tuple): locigal control qubit
@@ -310,6 +676,8 @@ class DeterministicSwap(CompilingStep):
         q1, q2 = control, target
         if self.wire(control) > self.wire(target):
             q1, q2 = q2, q1
+        if self._lookahead > 0 and self._recursive is False:
+            return self.lookahead_path(q1, q2)
         path = self.bring_closer(q1, q2)
         return path
 
@@ -320,24 +688,19 @@ class DeterministicSwap(CompilingStep):
             path (list): path of wires to follow on which to apply a sequence a SWAP gates
         """
         logger.debug('Swap Path: %s' % str(path))
+        self.report['swaps'] += len(path) - 1
         for q1, q2 in zip(path[:-1], path[1:]):
             logger.debug('SWAP: %s-%s' % (self.reg(q1), self.reg(q2)))
+            self.swap(self.reg(q1), self.reg(q2))
 
-            self.cx(self.reg(q1), self.reg(q2))
-            self.cx(self.reg(q2), self.reg(q1))
-            self.cx(self.reg(q1), self.reg(q2))
-
-        for e, q in enumerate(path[:-1]):
-            self._layout[self.reg(q)], self._layout[self.reg(path[e + 1])] = self._layout[
-                                                                                 self.reg(path[e + 1])], \
-                                                                             self._layout[self.reg(q)]
-            self._reg_to_wire[self.reg(q)], self._reg_to_wire[self.reg(path[e + 1])] = \
-                self.wire(self.reg(path[e + 1])), \
-                self.wire(self.reg(q))
-            self._wire_to_reg[q], self._wire_to_reg[path[e + 1]] = self.reg(path[e + 1]), self.reg(q)
-        logger.debug('Wire to Reg layout after swap' + str(self._wire_to_reg) + '\n')
-        logger.debug('Reg to Wire layout after swap' + str(self._reg_to_wire) + '\n')
-        logger.debug('Reg to Reg layout after swap' + str(self._layout) + '\n')
+        if len(set(path)) == len(path):
+            # the SWAPs move the first qubit to the end of the path and the others back of one wire
+            self._reg_at[path] = np.roll(self._reg_at[path], -1)
+        else:
+            for q1, q2 in zip(path[:-1], path[1:]):
+                self._reg_at[[q1, q2]] = self._reg_at[[q2, q1]]
+        self._wire_of[self._reg_at[path]] = path
+        logger.debug('Reg to Reg layout after swap %s\n', self._layout)
 
     def bring_closer(self, q1, q2):
         """Moves logical qubit *q1* over a neighbor of logical qubit *q2* using *from_q1_to_q2()* function
@@ -352,7 +715,7 @@ class DeterministicSwap(CompilingStep):
 
         self._available = self._available.difference(
             self._measured)
-        available_qubits = deepcopy(self._available)
+        available_qubits = set(self._available)
 
         logger.debug('Available qubits: %s' % str(available_qubits))
         common_neighbours = set(self._undirected_map[self.phys_q(q1)]).intersection(
@@ -360,10 +723,17 @@ class DeterministicSwap(CompilingStep):
         logger.debug('Common neighbours: ' + str(common_neighbours))
         if len(common_neighbours) != 0:
             swap_to = min((q for q in common_neighbours),
-                          key=lambda x: (
-                              abs(x - self.phys_q(q2)), self._depths[self._chain.index(x) - self._offset]))
-            logger.debug('Path: %s' % str([self.wire(q1), self._chain.index(swap_to) - self._offset]))
-            return [self.wire(q1), self._chain.index(swap_to) - self._offset]
+                          key=lambda x: (abs(x - self.phys_q(q2)), self._depths[self._positions[x] - self._offset]))
+            logger.debug('Path: %s' % str([self.wire(q1), self._positions[swap_to] - self._offset]))
+            return [self.wire(q1), self._positions[swap_to] - self._offset]
+        elif self._recursive is False:
+            try:
+                path = self.shortest_path(q1, q2, available_qubits)
+            except StepError:
+                # q1 cannot reach q2, try moving q2 instead
+                path = self.shortest_path(q2, q1, available_qubits)
+            logger.info('Path: ' + str(path))
+            return path
         else:
             path = self.from_q1_to_q2(q1, q2, available_qubits)
             logger.info('Path: ' + str(path))
@@ -374,7 +744,7 @@ class DeterministicSwap(CompilingStep):
                 loop = False
                 for x in self._available.intersection(
                         self._undirected_map[self._chain[(q + self._offset) % len(self._chain)]]):
-                    x_wire = self._chain.index(x)-self._offset
+                    x_wire = self._positions[x]-self._offset
                     if x_wire in temp[t + 2:]:
                         loop = True
                         t = temp.index(x_wire)
@@ -386,8 +756,179 @@ class DeterministicSwap(CompilingStep):
 
             return path
 
+    def segment_edges(self, offset, n_qubits):
+        """Counts the edges of the coupling map between the qubits of the chain segment
+        starting at *offset*, a cheap estimate of how many SWAPs the segment will need.
+
+        Args:
+            offset (int): the offset of the segment in the chain
+            n_qubits (int): the length of the segment
+
+        Returns:
+            int: the number of edges inside the segment
+        """
+        segment = self._chain[offset:offset + n_qubits]
+        mask = 0
+        for q in segment:
+            mask |= 1 << q
+        return sum(bin(self._coupling_map.adjacency[q] & mask).count('1') for q in segment) // 2
+
+    def connected(self, qubits):
+        """Checks if a set of physical qubits is connected in the coupling map,
+        without passing through other qubits.
+
+        Args:
+            qubits (list): list of physical qubits
+
+        Returns:
+            bool: True if the qubits are connected, False otherwise
+        """
+        if len(qubits) == 0:
+            return True
+        qubits = set(qubits)
+        explored = {next(iter(qubits))}
+        queue = deque(explored)
+        while queue:
+            q = queue.popleft()
+            for n in self._undirected_map[q]:
+                if n in qubits and n not in explored:
+                    explored.add(n)
+                    queue.append(n)
+        return len(explored) == len(qubits)
+
+    def shortest_path(self, q1, q2, available_qubits):
+        """Finds a shortest path moving logical qubit *q1* over a neighbor of logical qubit *q2*.
+        The neighbor is chosen with the cost function
+        f = (SWAP_DEPTH * distance_between_q1_and_neighbor) + max_depth_between_q1_and_neighbor
+
+        Args:
+            q1 (tuple): logical qubit to move
+            q2 (tuple): logical qubit to reach
+            available_qubits (set): set of physical qubits that can be used to create a path
+
+        Returns:
+            list: path of wires from q1 to q2
+        """
+        for path in self.candidate_paths(q1, q2, available_qubits):
+            return path
+        raise StepError('No path between physical qubits %d and %d' % (self.phys_q(q1), self.phys_q(q2)))
+
+    def candidate_paths(self, q1, q2, available_qubits):
+        """Generates the shortest paths moving logical qubit *q1* over each available neighbor of logical
+        qubit *q2*, from the best one according to the cost function of *shortest_path()*.
+
+        Args:
+            q1 (tuple): logical qubit to move
+            q2 (tuple): logical qubit to reach
+            available_qubits (set): set of physical qubits that can be used to create a path
+
+        Returns:
+            generator: paths of wires from q1 to q2
+        """
+        source = self.phys_q(q1)
+        destination = self.phys_q(q2)
+        neighbors = [n for n in self._undirected_map[destination] if n in available_qubits]
+        source_depth = self._depths[self.wire(q1)]
+        neighbors = sorted(neighbors, key=lambda n: (
+            self._distance[source, n] * self.SWAP_DEPTH + max(source_depth,
+                                                               self._depths[self._positions[n] - self._offset]),
+            self._distance[source, n], n))
+        for swap_to in neighbors:
+            path = [source]
+            while path[-1] != swap_to and path[-1] != -1:
+                path.append(int(self._next_hop[path[-1], swap_to]))
+            if path[-1] == -1 or destination in path or not available_qubits.issuperset(path[1:]):
+                try:
+                    path = self.available_path(source, swap_to, available_qubits.difference([destination]))
+                except StepError:
+                    continue
+            yield [self._positions[q] - self._offset for q in path]
+
+    def lookahead_path(self, q1, q2):
+        """Chooses the SWAP path bringing together logical qubits *q1* and *q2* looking at the next CNOTs.
+        Every shortest path moving one of the two qubits next to the other is rated with the cost function
+        f = n_swaps + LOOKAHEAD_WEIGHT * mean_distance_of_next_cnots_after_the_swaps
+        and ties are broken following the order of *candidate_paths()*.
+
+        Args:
+            q1 (tuple): logical qubit
+            q2 (tuple): logical qubit
+
+        Returns:
+            list: path of wires from q1 to q2 or from q2 to q1
+        """
+        self._available = self._available.difference(self._measured)
+        available_qubits = set(self._available)
+        next_cxs = self._cxs[self._cx_index + 1:self._cx_index + 1 + self._lookahead]
+        best, best_cost = None, None
+        for path in chain(self.candidate_paths(q1, q2, available_qubits),
+                          self.candidate_paths(q2, q1, available_qubits)):
+            distance = self.cxs_distance(next_cxs, path)
+            cost = len(path) - 1
+            if len(next_cxs) != 0:
+                cost += self.LOOKAHEAD_WEIGHT * distance / len(next_cxs)
+            if best is None or cost < best_cost:
+                best, best_cost = path, cost
+        if best is None:
+            raise StepError('No path between physical qubits %d and %d' % (self.phys_q(q1), self.phys_q(q2)))
+        logger.info('Path: ' + str(best))
+        return best
+
+    def cxs_distance(self, cxs, path=None):
+        """Sums the distances between the physical qubits of the CNOTs in *cxs*,
+        after the SWAPs along *path* if specified.
+
+        Args:
+            cxs (list): list of CNOTs as tuples (control, target) of logical qubits
+            path (list): path of wires of a SWAP sequence
+
+        Returns:
+            int: the sum of the distances
+        """
+        moved = dict()
+        if path:
+            # the SWAPs move the first qubit to the end of the path and the others back of one wire
+            moved[path[0]] = path[-1]
+            moved.update(zip(path[1:], path[:-1]))
+        distance = 0
+        for control, target in cxs:
+            control_wire, target_wire = self.wire(control), self.wire(target)
+            distance += self._distance[self._wire_phys[moved.get(control_wire, control_wire)],
+                                       self._wire_phys[moved.get(target_wire, target_wire)]]
+        return int(distance)
+
+    def available_path(self, source, destination, available_qubits):
+        """Finds a shortest path between two physical qubits with a breadth-first search
+        restricted to *available_qubits*.
+
+        Args:
+            source (int): the starting physical qubit
+            destination (int): the physical qubit to reach
+            available_qubits (set): set of physical qubits that can be used to create a path
+
+        Returns:
+            list: path of physical qubits from source to destination
+        """
+        parents = {source: None}
+        queue = deque([source])
+        while queue:
+            q = queue.popleft()
+            if q == destination:
+                path = [q]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1]
+            for n in self._undirected_map[q]:
+                if n not in parents and n in available_qubits:
+                    parents[n] = q
+                    queue.append(n)
+        raise StepError('No path between physical qubits %d and %d' % (source, destination))
+
     def from_q1_to_q2(self, q1, q2, available_qubits, path=None):
-        """Finds a path from locigal qubit *q1* to logical qubit *q2* recursively
+        """Finds a path from locigal qubit *q1* to logical qubit *q2*, moving one or two qubits at a time
+        towards *q2* and backtracking on dead ends. The search state is the path, extended and shortened
+        in place, and the bitset of the available qubits. A repeated state, that would make the search
+        loop forever, is detected with Brent's algorithm, keeping a single copy of a past state.
 
         Args:
             q1 (tuple): logical qubit to move
@@ -398,107 +939,147 @@ class DeterministicSwap(CompilingStep):
         Returns:
             list: path of wires from q1 to q2
         """
-        best = None
         if path is None:
             path = [self.wire(q1)]
-        logger.debug('Path: %s' % str(path))
-        available_qubits = set(available_qubits).difference([self.phys_q(q1)])
-        logger.debug('Available qubits: %s' % str(available_qubits))
-
-        first_round = self.order_dist_by_depth(self.phys_q(q2),
-                                               set(self._undirected_map[self.phys_q(q1)]).intersection(
-                                                   available_qubits),
-                                               available_qubits)
-
-        if len(first_round) == 0:
-            self.from_q1_to_q2(self.reg(path[-2]), q2, available_qubits.union(
-                self._undirected_map[self._chain[(path[-2] + self._offset) % len(self._chain)]]).difference(
-                [self._chain[(path[-1] + self._offset) % len(self._chain)]]).intersection(self._available),
-                               path[:-1])
-        logger.debug('Frist round: ' + str(first_round))
-        if self.phys_q(q2) in [x[0] for x in first_round]:
-            return path
-        for q in first_round:
-            if len(q) == 2:
-                path.extend([self._chain.index(q[0]) - self._offset, self._chain.index(q[1]) - self._offset])
-                return path
-            logger.debug('Second round neighbours: ' + str(
-                set(self._undirected_map[q[0]]).intersection(available_qubits).difference(
-                    self._undirected_map[self.phys_q(q1)])))
-            second_round = self.order_dist_by_depth(self.phys_q(q2),
-                                                    set(self._undirected_map[q[0]]).intersection(
-                                                        available_qubits).difference(
-                                                        self._undirected_map[self.phys_q(q1)]),
-                                                    set(available_qubits).difference([q[0]]))
-            if len(second_round) == 0:
-                continue
-            logger.debug('Second round: ' + str(second_round))
-            if len(second_round[0]) == 2:
-                path.extend(
-                    [self._chain.index(q[0]) - self._offset,
-                     self._chain.index(second_round[0][0]) - self._offset,
-                     self._chain.index(second_round[0][1]) - self._offset])
-                return path
-            if best is None or second_round[0][2] < best[1][1]:
-                best = (q[0], (second_round[0][0], second_round[0][2]))
-                logger.debug('Best: ' + str(best))
-            if self.phys_q(q2) in [x[0] for x in second_round]:
-                path.append(self._chain.index(q[0]) - self._offset)
+        destination = self.phys_q(q2)
+        adjacency = self._coupling_map.adjacency
+        allowed = 0
+        for q in self._available:
+            allowed |= 1 << q
+        available = 0
+        for q in available_qubits:
+            available |= 1 << q
+        # the past state compared with the current one, replaced after *power* steps
+        saved, power, steps = None, 1, 0
+        while True:
+            logger.debug('Path: %s' % str(path))
+            source = self.phys_q(q1)
+            available &= ~(1 << source)
+            if saved is not None and saved[1] == available and saved[0] == path:
+                raise StepError('No path between physical qubits %d and %d' % (source, destination))
+            steps += 1
+            if steps == power:
+                saved, power, steps = (list(path), available), 2 * power, 0
+            not_source_neighbors = ~adjacency[source]
+
+            best = None
+            first_neighbors, q_neighbors, costs = self.dist_by_depth(
+                destination, self.available_neighbors(source, available), available)
+            first_round = self.best_by_depth(first_neighbors, q_neighbors, costs)
+            logger.debug('Frist round: ' + str(first_round))
+            if first_round is not None and len(first_round) == 2:
+                if first_round[0] != destination:
+                    path.extend([self._positions[first_round[0]] - self._offset,
+                                 self._positions[first_round[1]] - self._offset])
                 return path
+            # first round qubits, from the one with the cheapest move
+            ranked = first_neighbors[np.argsort(costs.min(axis=1), kind='stable')] if costs.size != 0 else []
+            for n in ranked:
+                n = int(n)
+                second_neighbors = self.available_neighbors(n, available & not_source_neighbors)
+                logger.debug('Second round neighbours: ' + str(second_neighbors))
+                second_round = self.order_dist_by_depth(destination, second_neighbors, available & ~(1 << n))
+                if second_round is None:
+                    continue
+                logger.debug('Second round: ' + str(second_round))
+                if len(second_round) == 2:
+                    path.extend(
+                        [self._positions[n] - self._offset,
+                         self._positions[second_round[0]] - self._offset,
+                         self._positions[second_round[1]] - self._offset])
+                    return path
+                if best is None or second_round[2] < best[1][1]:
+                    best = (n, (second_round[0], second_round[2]))
+                    logger.debug('Best: ' + str(best))
+
+            if best is None:
+                # dead end, go back of one step
+                if len(path) < 2:
+                    raise StepError('No path between physical qubits %d and %d' % (source, destination))
+                previous = self._chain[(path[-2] + self._offset) % len(self._chain)]
+                available = (available | adjacency[previous]) & not_source_neighbors & allowed
+                path.pop()
+            else:
+                available &= ~(1 << best[0]) & not_source_neighbors
+                path.append(self._positions[best[0]] - self._offset)
+            q1 = self.reg(path[-1])
 
-        if best is None:
-            return self.from_q1_to_q2(self.reg(path[-2]), q2, available_qubits.union(
-                self._undirected_map[self._chain[(path[-2] + self._offset) % len(self._chain)]]).difference(
-                self._undirected_map[self._chain[(path[-1] + self._offset) % len(self._chain)]]).intersection(
-                self._available), path[:-1])
+    def available_neighbors(self, q, available):
+        """
+        Args:
+            q (int): physical qubit
+            available (int): the bitset of the physical qubits than can be used
 
-        path.append(self._chain.index(best[0]) - self._offset)
-        return self.from_q1_to_q2(self.reg(self._chain.index(best[0]) - self._offset), q2,
-                                  set(available_qubits).difference([best[0]]).difference(
-                                      self._undirected_map[
-                                          self._chain[(path[-2] + self._offset) % len(self._chain)]]),
-                                  path=path)
+        Returns:
+            list: the available neighbors of *q*, in the order of the set intersection the search used to
+                compute, so that ties between equally cheap moves are broken as before
+        """
+        return list({n for n in set(self._undirected_map[q]) if (available >> n) & 1})
 
-    def order_dist_by_depth(self, q, neighbors, available_qubits):
-        """Rates every qubit in neighbors based ont their depth and distance from neighbors of qubit *q*
+    def dist_by_depth(self, q, neighbors, available):
+        """Rates every qubit in neighbors based on their depth and distance from the neighbors of qubit *q*
 
         Args:
             q (int): physical qubit
-            neighbors (set): set of physical qubits
-            available_qubits (set): set physical qubits than can be used
+            neighbors (list): list of physical qubits
+            available (int): the bitset of the physical qubits than can be used
 
         Returns:
-            list: list of tuples (n, m, dist) where n is a qubit from neighbors,
-            m is a qubit from the neighbors of q and dist is a distance estimate between n and m.
-                If n and m are neighbors, ut return only the tuple (n, m) with no distance estimate
+            tuple: the array of qubits in neighbors, the array of available neighbors of q and the matrix of
+                costs, where *costs[i, j]* is the cost of moving the i-th qubit of neighbors over
+                the j-th neighbor of q
         """
-        q_neighbors = set(self._undirected_map[q]).intersection(available_qubits)
-
-        # neighbors are sorted using a cost function f
-        # f = (SWAP_DEPTH * estimated_distance_between_n_and_q) + max_depth_between_n_and_q
-        # where SWAP_DEPTH is the maximum cost in depth for a single
+        q_neighbors = self.available_neighbors(q, available)
         logger.debug('Neighbors: %s' % neighbors)
         logger.debug('Q_Neighbors: %s' % q_neighbors)
-        temp_evaluated = [(n, q, max(
-            [self._depths[self._chain.index(n) - self._offset],
-             self._depths[self._chain.index(q) - self._offset]])) for
-                          n in
-                          neighbors for q in q_neighbors if
-                          abs(n - q) == 1 and q in self._undirected_map[n] or abs(n - q) != 1]
-        evaluated = list()
-        for e in temp_evaluated:
-            chain_dist = abs(self._chain.index(e[0])-self._chain.index(e[1]))
-            if abs(e[0]-e[1]) > chain_dist:
-                evaluated.append((e[0], e[1], chain_dist*self.SWAP_DEPTH+e[2]))
-            else:
-                evaluated.append((e[0], e[1], abs(e[0]-e[1])*self.SWAP_DEPTH+e[2]))
-        evaluated = sorted(evaluated, key=lambda x: x[2])
-        logger.debug('Evaluated: ' + str(evaluated))
+        neighbors = np.array(neighbors, dtype=np.int64)
+        q_neighbors = np.array(q_neighbors, dtype=np.int64)
+
+        # f = (SWAP_DEPTH * distance_between_n_and_q) + max_depth_between_n_and_q
+        # where SWAP_DEPTH is the maximum cost in depth for a single SWAP
+        costs = self._distance[np.ix_(neighbors, q_neighbors)] * self.SWAP_DEPTH + np.maximum.outer(
+            self._depths[self._phys_wire[neighbors]], self._depths[self._phys_wire[q_neighbors]])
+        return neighbors, q_neighbors, costs
+
+    def best_by_depth(self, neighbors, q_neighbors, costs):
+        """Selects the cheapest move rated by *dist_by_depth()*.
+
+        Args:
+            neighbors (numpy.ndarray): the qubits to move
+            q_neighbors (numpy.ndarray): the qubits to reach
+            costs (numpy.ndarray): the matrix of costs
+
+        Returns:
+            tuple: the tuple (n, m, cost) with the lowest cost, where n is a qubit from neighbors and
+                m is a qubit from q_neighbors. If some n and m are already neighbors, it returns
+                only the tuple (n, m) with the lowest cost among them. None if there are no moves
+        """
+        if costs.size == 0:
+            return None
         # sometimes destination can be reached even if the estimated distance is not 1
-        for e in evaluated:
-            if e[0] in self._undirected_map[e[1]]:
-                return [(e[0], e[1])]
-        return evaluated
+        adjacent = self._distance[np.ix_(neighbors, q_neighbors)] == 1
+        if adjacent.any():
+            i, j = np.unravel_index(np.argmin(np.where(adjacent, costs, np.iinfo(costs.dtype).max)), costs.shape)
+            return int(neighbors[i]), int(q_neighbors[j])
+        i, j = np.unravel_index(np.argmin(costs), costs.shape)
+        return int(neighbors[i]), int(q_neighbors[j]), int(costs[i, j])
+
+    def order_dist_by_depth(self, q, neighbors, available):
+        """Finds the cheapest move of a qubit in neighbors over a neighbor of qubit *q*,
+        based on their depth and distance.
+
+        Args:
+            q (int): physical qubit
+            neighbors (list): list of physical qubits
+            available (int): the bitset of the physical qubits than can be used
+
+        Returns:
+            tuple: the tuple (n, m, dist) where n is a qubit from neighbors, m is a qubit from
+                the neighbors of q and dist is the lowest cost of moving n over m.
+                If n and m are neighbors, it returns only the tuple (n, m) with no cost.
+                None if there are no moves
+        """
+        return self.best_by_depth(*self.dist_by_depth(q, neighbors, available))
 
     def maps_as_dict(self):
         """From the coupling map, obtains a dictionary representation of the directed
@@ -514,22 +1095,6 @@ class DeterministicSwap(CompilingStep):
         Returns:
             tuple: the directed map and undirected map as dictionaries
         """
-        directed_map = dict()
-        undirected_map = dict()
-        for edge in self._coupling_map:
-            if (edge[1], edge[0]) not in self._coupling_map:
-                self.SWAP_DEPTH = 5
-            if edge[0] not in directed_map:
-                directed_map.update({edge[0]: []})
-            if edge[0] not in undirected_map:
-                undirected_map.update({edge[0]: []})
-            if edge[1] not in directed_map:
-                directed_map.update({edge[1]: []})
-            if edge[1] not in undirected_map:
-                undirected_map.update({edge[1]: []})
-            directed_map[edge[0]].append(edge[1])
-            if edge[1] not in undirected_map[edge[0]]:
-                undirected_map[edge[0]].append(edge[1])
-            if edge[0] not in undirected_map[edge[1]]:
-                undirected_map[edge[1]].append(edge[0])
-        return directed_map, undirected_map
+        if self._coupling_map.directed:
+            self.SWAP_DEPTH = 5
+        return self._coupling_map.directed_map, self._coupling_map.undirected_map
@@ -1,6 +1,14 @@
+import logging
+
+from padqc.coupling_map import CouplingMap
 from padqc.gates import Cx, Hadamard
 from padqc.q_graph import Graph, Node
 from padqc.steps import TransformationStep
+from padqc.steps.exceptions import StepError
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.CRITICAL)
 
 
 class Patterns(TransformationStep):
@@ -8,15 +16,32 @@ class Patterns(TransformationStep):
     Transformation step for specific two-qubit gate patterns.
     """
 
-    def __init__(self):
+    def __init__(self, coupling_map=None, offset=0):
+        """
+        Args:
+            coupling_map (list | CouplingMap): if specified, nearest-neighbor CNOT sequences are ordered following
+                the chain in *properties['layout']* and the coupling map, instead of following the logical wire index.
+                The native CNOT direction only breaks ties between equally close wires, CNOTs are not re-oriented
+            offset (int): the offset DeterministicSwap will lay the wires with on the chain, wire i is on
+                physical qubit *layout[i + offset]*. DeterministicSwap offset tuning runs after Patterns,
+                so with tuning costs are estimated for this offset and not for the tuned one. Defaults to 0
+        """
         super().__init__()
+        if coupling_map is not None:
+            if not isinstance(coupling_map, (list, CouplingMap)):
+                raise StepError('Coupling map of type %s is not valid' % coupling_map.__class__)
+            coupling_map = CouplingMap.from_edges(coupling_map)
+        self._coupling_map = coupling_map
         self._num_qubits = None
         self._wires_to_id = {}
         self._id_to_wires = {}
         self._layers = None
         self._extra_layers = None
         self._skip = []
+        self._chain = None
+        self._offset = offset
         self.patterns = 0
+        self.report = {'cx': 0, 'routed_cx': 0, 'depth': 0, 'routed_depth': 0}
 
     def run(self, q_circuit):
         """Executes the transformation step.
@@ -31,8 +56,128 @@ class Patterns(TransformationStep):
                 self._wires_to_id[(q_reg['id'], q)] = i
                 self._id_to_wires[i] = (q_reg['id'], q)
                 i += 1
+        if self._coupling_map is not None:
+            self._chain = self._properties.get('layout') or list(range(self._num_qubits))
+            if len(self._chain) < self._num_qubits + self._offset:
+                raise StepError('Layout has %d qubits, %d needed with offset %d.'
+                                % (len(self._chain), self._num_qubits + self._offset, self._offset))
         self.find_pattern(q_circuit)
         q_circuit.patterns = self.patterns
+        if self._coupling_map is not None:
+            logger.info('Estimated CX count %d -> %d, estimated depth %d -> %d'
+                        % (self.report['cx'], self.report['routed_cx'],
+                           self.report['depth'], self.report['routed_depth']))
+            self._properties['patterns_report'] = self.report
+
+    def phys_q(self, wire_id):
+        """Returns the physical qubit a wire is laid on, following the chain in *properties['layout']*
+        from the offset, as DeterministicSwap does.
+
+        Args:
+            wire_id (int): the wire index
+
+        Returns:
+            int: the physical qubit
+        """
+        return self._chain[wire_id + self._offset]
+
+    def distance(self, wire_1, wire_2):
+        """Returns the distance in the coupling map between the physical qubits of two wires.
+
+        Args:
+            wire_1 (int): the first wire index
+            wire_2 (int): the second wire index
+
+        Returns:
+            int: the distance, len(coupling_map) if the qubits are not connected
+        """
+        return int(self._coupling_map.distance[self.phys_q(wire_1), self.phys_q(wire_2)])
+
+    def reversed_cx(self, control, target):
+        """Checks if a CNOT between two wires goes against the coupling map direction.
+
+        Args:
+            control (int): the control wire index
+            target (int): the target wire index
+
+        Returns:
+            bool: True if the CNOT must be inverted on the device, False otherwise
+        """
+        return not self._coupling_map.is_edge(self.phys_q(control), self.phys_q(target))
+
+    def chain_order(self, wires, anchor):
+        """Orders *wires* as a sequence starting next to *anchor*, where every wire is followed by the
+        closest remaining one on the coupling map. Ties are broken preferring the native CNOT direction
+        from a wire to its predecessor, then the logical wire index.
+
+        Args:
+            wires (list): the wire indices to order
+            anchor (int): the wire index the sequence starts from
+
+        Returns:
+            list: the ordered wire indices
+        """
+        ordered = list()
+        remaining = list(wires)
+        current = anchor
+        while remaining:
+            current = min(remaining, key=lambda w: (self.distance(current, w), self.reversed_cx(w, current),
+                                                    abs(w - current), w))
+            remaining.remove(current)
+            ordered.append(current)
+        return ordered
+
+    def estimate_cost(self, cxs):
+        """Estimates CNOT count and depth of a sequence of CNOTs on the coupling map,
+        as SWAPs needed to make them nearest-neighbor and Hadamard gates needed to invert them.
+
+        Args:
+            cxs (list): list of tuples (control, target) of wire indices, in the order they are applied
+
+        Returns:
+            tuple: the estimated CNOT count and depth
+        """
+        cx_count = 0
+        depth = 0
+        for control, target in cxs:
+            swaps = max(self.distance(control, target) - 1, 0)
+            cx_count += 1 + 3 * swaps
+            depth += 1 + 3 * swaps
+            if swaps == 0 and self.reversed_cx(control, target):
+                depth += 2
+        return cx_count, depth
+
+    def nn_sequence(self, wires, anchor, descending):
+        """Orders the wires of a cascade into a nearest-neighbor CNOT sequence ending on *anchor*.
+        In routing-aware mode, the order following the chain and the coupling map is used
+        when it is estimated to be cheaper than the one following the logical wire index.
+
+        Args:
+            wires (list): the wires of the cascade, other than *anchor*
+            anchor (int): the wire shared by every CNOT of the cascade
+            descending (bool): the direction of the cascade
+
+        Returns:
+            list: the ordered wires, the first one being the one next to *anchor*
+        """
+        default = sorted(wires, reverse=not descending)
+        if self._coupling_map is None:
+            return default
+        costs = dict()
+        for key, sequence in (('default', default), ('routed', self.chain_order(wires, anchor))):
+            cxs = [(sequence[i], sequence[i - 1]) for i in range(len(sequence) - 1, 0, -1)]
+            cxs = cxs + [(sequence[0], anchor)] + cxs[::-1]
+            costs[key] = (self.estimate_cost(cxs), sequence)
+        if costs['routed'][0] < costs['default'][0]:
+            routed = costs['routed'][1]
+        else:
+            routed = default
+        self.report['cx'] += costs['default'][0][0]
+        self.report['depth'] += costs['default'][0][1]
+        self.report['routed_cx'] += min(costs['default'][0], costs['routed'][0])[0]
+        self.report['routed_depth'] += min(costs['default'][0], costs['routed'][0])[1]
+        logger.debug('Cascade on %d: %s -> %s' % (anchor, str(default), str(routed)))
+        return routed
 
     def find_pattern(self, q_circuit):
         """Finds specific two-qubit gate patterns in *q_circuit*
@@ -47,8 +192,9 @@ class Patterns(TransformationStep):
         for register in q_graph.c_registers:
             new_graph._add_c_register(register, q_circuit.c_regs[register][1])
 
-        # get dag layers
-        self._layers = [layer for layer in q_circuit.q_graph.layers()]
+        # get dag layers, without the classic output nodes of measured circuits
+        self._layers = [[node for node in layer if node.type != 'classic_output']
+                        for layer in q_circuit.q_graph.layers()]
         # this is the list of new layers for the nearest-neighbor CNOT sequences
         self._extra_layers = {l: [] for l in range(len(self._layers))}
 
@@ -245,10 +391,7 @@ class Patterns(TransformationStep):
                 break
         # if a cascade was found
         if len(controls) > 1:
-            if descending is True:
-                controls = sorted(controls)
-            else:
-                controls = sorted(controls, reverse=True)
+            controls = self.nn_sequence(controls, target, descending)
 
             # apply all gates that were encountered before the cascade
             for u in before:
@@ -427,10 +570,7 @@ class Patterns(TransformationStep):
                 break
         # if an inverse cascade was found
         if len(targets) > 1:
-            if descending is True:
-                targets = sorted(targets)
-            else:
-                targets = sorted(targets, reverse=True)
+            targets = self.nn_sequence(targets, control, descending)
 
             # apply all gates that were encountered before the cascade
             for u in before:
@@ -1,2 +1 @@
 from .visualize import circuit_drawer
-from .depth import *
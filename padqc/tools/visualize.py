@@ -3,9 +3,6 @@ import sys
 import tempfile
 from copy import deepcopy
 
-from networkx.drawing.nx_pydot import to_pydot
-from PIL import Image
-
 
 def circuit_drawer(q_circuit, filename=None, scale=0.7, show=False):
     """Plots the graph representing operations in a quantum circuit.
@@ -19,6 +16,9 @@ def circuit_drawer(q_circuit, filename=None, scale=0.7, show=False):
         filename (str): file path to save image
         scale (float): scaling factor
     """
+    # pydot and Pillow are needed only for drawing
+    from networkx.drawing.nx_pydot import to_pydot
+    from PIL import Image
 
     g = deepcopy(q_circuit.q_graph.graph)
     g.graph['dpi'] = 100 * scale
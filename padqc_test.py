@@ -1,10 +1,10 @@
 import logging
 
 from qiskit import QuantumCircuit, transpile
-from qiskit.test.mock import FakeTokyo, FakeRochester, FakeMelbourne
 from qiskit.transpiler import CouplingMap
 
 from padqc import compile
+from padqc.coupling_map import MELBOURNE
 from padqc.converters import qasm_from_circuit, circuit_from_qasm
 from padqc.steps import ChainLayout, Patterns, CancelCx, CancelH, MergeBarrier
 
@@ -14,7 +14,7 @@ logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-coupling_list = FakeMelbourne().configuration().coupling_map
+coupling_list = MELBOURNE
 
 coupling_map = CouplingMap(coupling_list)
 
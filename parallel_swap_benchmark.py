@@ -0,0 +1,37 @@
+import os
+from copy import deepcopy
+
+from padqc import compile
+from padqc.coupling_map import TOKYO
+from padqc.converters import circuit_from_qasm
+from padqc.steps import ChainLayout, Patterns, DeterministicSwap
+
+# Compiles the benchmark circuits on Tokyo with the sequential and the parallel SWAP scheduling
+# of DeterministicSwap, printing for both the SWAP count, the depth and the compile time of the step,
+# as written in its report, and their totals.
+
+coupling_list = TOKYO
+
+directory = 'benchmarks_qasm/'
+
+# circuits with more gates are skipped, to keep the run short
+max_gates = 20000
+
+totals = {False: [0, 0, 0.], True: [0, 0, 0.]}
+print('%-24s %21s %21s' % ('circuit', 'sequential', 'parallel'))
+for qasm_file in sorted(os.listdir(directory)):
+    with open(os.path.join(directory, qasm_file)) as file:
+        circuit = circuit_from_qasm(file.read())
+    if circuit.q_graph.graph.number_of_nodes() > max_gates:
+        continue
+    compile(circuit, steps=[ChainLayout(coupling_list, n_qubits=circuit.n_qubits), Patterns()], explicit=True)
+    row = list()
+    for parallel in (False, True):
+        routed = deepcopy(circuit)
+        compile(routed, steps=[DeterministicSwap(coupling_list, parallel=parallel)], explicit=True)
+        report = routed.properties['swap_report']
+        row.append('%6d %6d %7.2fs' % (report['swaps'], report['depth'], report['time']))
+        for i, key in enumerate(('swaps', 'depth', 'time')):
+            totals[parallel][i] += report[key]
+    print('%-24s %21s %21s' % (qasm_file, row[0], row[1]))
+print('%-24s %6d %6d %7.2fs %6d %6d %7.2fs' % ('total', *totals[False], *totals[True]))
@@ -0,0 +1,56 @@
+import random
+from copy import deepcopy
+from time import perf_counter
+
+import networkx as nx
+
+from padqc import QCircuit
+from padqc.steps import DeterministicSwap
+
+# Routes a random circuit on synthetic heavy-hex devices with the recursive path search of DeterministicSwap
+# (recursive=True) and with the default shortest path search, printing depth, CNOT count and compile time.
+# Only the public API is used, so the script also runs on older commits to compare their routing.
+# The circuit uses every qubit of the device, with 3 CNOTs per qubit between random pairs,
+# and the layout is the depth-first order of the device qubits.
+
+# heavy-hex lattices as (rows, qubits per row), with 127 and 433 qubits
+devices = [(5, 21), (23, 15)]
+
+seed = 1
+
+
+def heavy_hex(rows, cols):
+    # the lattice of padqc.coupling_map.heavy_hex(), defined here for the commits that precede it
+    edges = [(r * cols + c, r * cols + c + 1) for r in range(rows) for c in range(cols - 1)]
+    bridge = rows * cols
+    for r in range(rows - 1):
+        for c in range(0 if r % 2 == 0 else 2, cols, 4):
+            edges.extend([(r * cols + c, bridge), (bridge, (r + 1) * cols + c)])
+            bridge += 1
+    return edges + [(q2, q1) for q1, q2 in edges]
+
+
+def random_circuit(n_qubits, n_gates, rng):
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', n_qubits)
+    for _ in range(n_gates):
+        a, b = rng.sample(range(n_qubits), 2)
+        circuit.cx(q[a], q[b])
+    return circuit
+
+
+for rows, cols in devices:
+    coupling_map = heavy_hex(rows, cols)
+    chain = list(nx.dfs_preorder_nodes(nx.Graph(coupling_map), 0))
+    circuit = random_circuit(len(chain), 3 * len(chain), random.Random(seed))
+    for recursive in (True, False):
+        routed = deepcopy(circuit)
+        step = DeterministicSwap(coupling_map, offset=0, recursive=recursive)
+        step.properties = {'layout': chain}
+        start = perf_counter()
+        step.run(routed)
+        elapsed = perf_counter() - start
+        cx_count = sum(1 for node in routed.q_graph.graph.nodes if node.gate.name == 'cx')
+        print('heavy-hex %dx%d, %d qubits, %s search: depth %d, %d CNOTs, %.2fs'
+              % (rows, cols, len(chain), 'recursive' if recursive else 'shortest path',
+                 routed.depth(), cx_count, elapsed))
@@ -0,0 +1,147 @@
+from math import pi
+
+import numpy as np
+from networkx import topological_sort
+
+from padqc.converters.qasm_parser import gate_expansion
+from padqc.gates import Cx, Swap
+from padqc.gates.base_gates import DummyGate
+from padqc.gates.single_q_gates import Id, Pauli_X, Pauli_Y, Pauli_Z, Rx, Ry, Rz, Hadamard
+
+
+def u3(theta, phi, lam):
+    """
+    Args:
+        theta (float): the u3 theta parameter
+        phi (float): the u3 phi parameter
+        lam (float): the u3 lambda parameter
+
+    Returns:
+        numpy.ndarray: the unitary matrix of the u3 gate
+    """
+    return np.array([[np.cos(theta / 2), -np.exp(1j * lam) * np.sin(theta / 2)],
+                     [np.exp(1j * phi) * np.sin(theta / 2), np.exp(1j * (phi + lam)) * np.cos(theta / 2)]])
+
+
+CX = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
+
+# the unitary matrices of the gates, as functions of the gate, the first qubit is the most significant
+UNITARIES = {
+    Id: lambda gate: np.eye(2),
+    Pauli_X: lambda gate: np.array([[0, 1], [1, 0]]),
+    Pauli_Y: lambda gate: np.array([[0, -1j], [1j, 0]]),
+    Pauli_Z: lambda gate: np.diag([1, -1]),
+    Hadamard: lambda gate: np.array([[1, 1], [1, -1]]) / np.sqrt(2),
+    Rx: lambda gate: u3(float(gate.theta), -pi / 2, pi / 2),
+    Ry: lambda gate: u3(float(gate.theta), 0, 0),
+    Rz: lambda gate: u3(0, 0, float(gate.theta)),
+    Cx: lambda gate: CX,
+    Swap: lambda gate: np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]]),
+}
+
+
+def apply(state, unitary, axes):
+    """
+    Args:
+        state (numpy.ndarray): the state, with one axis of dimension 2 per qubit
+        unitary (numpy.ndarray): the unitary matrix of the gate
+        axes (list): the axes of the qubits the gate acts on
+
+    Returns:
+        numpy.ndarray: the state after the gate
+    """
+    n = len(axes)
+    unitary = np.asarray(unitary).reshape((2,) * 2 * n)
+    state = np.tensordot(unitary, state, axes=(list(range(n, 2 * n)), axes))
+    return np.moveaxis(state, list(range(n)), axes)
+
+
+def random_state(n_qubits, rng):
+    """
+    Args:
+        n_qubits (int): the number of qubits
+        rng (numpy.random.Generator): the random number generator
+
+    Returns:
+        numpy.ndarray: a random normalized state, with one axis of dimension 2 per qubit
+    """
+    state = rng.normal(size=2 ** n_qubits) + 1j * rng.normal(size=2 ** n_qubits)
+    return (state / np.linalg.norm(state)).reshape((2,) * n_qubits)
+
+
+def simulate(circuit, state=None, wires=None):
+    """Applies the unitary gates of a circuit to a state, measurements and barriers are ignored.
+
+    Args:
+        circuit (QCircuit): the circuit
+        state (numpy.ndarray): the initial state, defaults to all qubits in 0
+        wires (dict): the axis of the state of every logical qubit (q_reg_id, q_reg_index),
+            defaults to the order of *circuit.q_regs_list*
+
+    Returns:
+        numpy.ndarray: the final state
+    """
+    if wires is None:
+        wires = {q_arg: axis for axis, q_arg in enumerate(circuit.q_regs_list)}
+    if state is None:
+        state = np.zeros((2,) * len(wires), dtype=complex)
+        state[(0,) * len(wires)] = 1
+    for node in topological_sort(circuit.q_graph.graph):
+        gate = node.gate
+        if type(gate) in UNITARIES:
+            state = apply(state, UNITARIES[type(gate)](gate), [wires[q_arg] for q_arg in gate.q_args])
+        elif isinstance(gate, DummyGate):
+            for kind, params, indexes in gate_expansion(gate.name, gate.params):
+                axes = [wires[gate.q_args[i]] for i in indexes]
+                if kind == 'U':
+                    state = apply(state, u3(*params), axes)
+                elif kind == 'CX':
+                    state = apply(state, CX, axes)
+    return state
+
+
+def same_state(state_1, state_2):
+    """
+    Args:
+        state_1 (numpy.ndarray): a normalized state
+        state_2 (numpy.ndarray): a normalized state
+
+    Returns:
+        bool: True if the states are equal up to a global phase
+    """
+    return abs(abs(np.vdot(state_1, state_2)) - 1) < 1e-9
+
+
+def same_routed_circuit(original, routed, rng):
+    """Checks a circuit compiled by DeterministicSwap against the original one on a random state.
+    Logical qubit q of the original circuit ends on qubit *routed._layout[q]* of the routed circuit.
+
+    Args:
+        original (QCircuit): the original circuit
+        routed (QCircuit): the routed circuit
+        rng (numpy.random.Generator): the random number generator
+
+    Returns:
+        bool: True if the circuits give the same state up to the final layout and a global phase
+    """
+    regs = original.q_regs_list
+    state = random_state(len(regs), rng)
+    axes = {q_arg: axis for axis, q_arg in enumerate(routed.q_regs_list)}
+    routed_state = np.transpose(simulate(routed, state), [axes[routed._layout[q_arg]] for q_arg in regs])
+    return same_state(simulate(original, state), routed_state)
+
+
+def on_device(routed, coupling_map, chain, offset=0):
+    """
+    Args:
+        routed (QCircuit): a circuit compiled by DeterministicSwap
+        coupling_map (CouplingMap): the coupling map of the device
+        chain (list): the chain of physical qubits the circuit was compiled on
+        offset (int): the offset of the compilation
+
+    Returns:
+        bool: True if every two-qubit gate acts on neighbors of the device
+    """
+    phys = {q_arg: chain[i + offset] for i, q_arg in enumerate(routed.q_regs_list)}
+    return all(coupling_map.adjacent(phys[node.gate.q_args[0]], phys[node.gate.q_args[1]])
+               for node in routed.q_graph.graph.nodes if isinstance(node.gate, (Cx, Swap)))
@@ -0,0 +1,179 @@
+import json
+import os
+from time import perf_counter
+
+import pytest
+
+from padqc import QCircuit
+from padqc.coupling_map import ALMADEN, MELBOURNE, ROCHESTER, TOKYO, CouplingMap, grid, heavy_hex
+from padqc.steps import ChainLayout
+from padqc.steps import chain_layout as module
+from padqc.steps.exceptions import StepError
+
+# the chains of the search that preceded the linear time find_chain(), for n_qubits 12 and None
+CHAINS = {
+    'tokyo': (TOKYO, {
+        12: [0, 1, 2, 6, 7, 8, 12, 13, 14, 18, 17, 11, 5, 10, 15, 16],
+        None: [0, 1, 2, 6, 7, 3, 9, 4, 8, 12, 19, 13, 14, 18, 17, 11, 5, 10, 15, 16]}),
+    'almaden': (ALMADEN, {
+        12: [0, 1, 2, 3, 8, 9, 14, 13, 12, 7, 6, 5, 10, 11, 16, 17, 18, 19],
+        None: [0, 1, 2, 4, 3, 8, 9, 14, 13, 12, 7, 6, 5, 10, 11, 15, 16, 17, 18, 19]}),
+    'melbourne': (MELBOURNE, {
+        12: [0, 1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12, 13],
+        None: [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13]}),
+}
+
+
+def chain_layout(edges, **kwargs):
+    """
+    Args:
+        edges (list): the edges of the coupling map
+        **kwargs: the options of the step
+
+    Returns:
+        ChainLayout: the step, ready to call its search methods
+    """
+    step = ChainLayout(edges, **kwargs)
+    step._undirected_map = step.undirected_map()
+    return step
+
+
+@pytest.mark.parametrize('device', sorted(CHAINS))
+def test_find_chain_matches_the_previous_search(device):
+    edges, chains = CHAINS[device]
+    step = chain_layout(edges)
+    for n_qubits, chain in chains.items():
+        assert step.find_chain(n_qubits=n_qubits) == chain
+    for n_qubits in range(1, len(chains[None]) + 1):
+        assert len(step.find_chain(n_qubits=n_qubits)) >= n_qubits
+
+
+@pytest.mark.parametrize('edges', [ROCHESTER, heavy_hex(5, 21)])
+def test_default_chain_on_heavy_hex(edges):
+    # find_chain() can not connect every qubit of a heavy-hex lattice, the default chain is the longest it finds
+    step = ChainLayout(edges)
+    step.run()
+    chain = step.properties['layout']
+    n_qubits = CouplingMap.from_edges(edges).n_qubits
+    assert len(set(chain)) == len(chain) < n_qubits
+    assert step.find_chain(n_qubits=len(chain)) == chain
+    with pytest.raises(StepError):
+        step.find_chain(n_qubits=len(chain) + 1)
+
+
+def longest_run(coupling_map, chain):
+    """
+    Args:
+        coupling_map (CouplingMap): the coupling map of the device
+        chain (list): a chain of physical qubits
+
+    Returns:
+        int: the number of qubits of the longest simple path made by consecutive qubits of the chain
+    """
+    best = run = 1
+    for q1, q2 in zip(chain[:-1], chain[1:]):
+        run = run + 1 if coupling_map.adjacent(q1, q2) else 1
+        best = max(best, run)
+    return best
+
+
+@pytest.mark.parametrize('edges', [MELBOURNE, TOKYO, ALMADEN, grid(3, 4), heavy_hex(2, 7)])
+def test_exact_chain_is_a_longest_path(edges):
+    coupling_map = CouplingMap.from_edges(edges)
+    step = chain_layout(edges, exact=True, time_limit=None)
+    path, complete = coupling_map.longest_path()
+    assert complete
+    assert len(set(path)) == len(path)
+    assert all(coupling_map.adjacent(q1, q2) for q1, q2 in zip(path[:-1], path[1:]))
+    # the greedy chain can jump between qubits that are not neighbors, only its simple paths are compared
+    assert len(path) >= longest_run(coupling_map, step.find_chain())
+    assert step.exact_chain(n_qubits=len(path)) == path
+    assert step.exact_chain(n_qubits=len(path) + 1) is None
+
+
+def test_exact_chain_time_limit():
+    edges = heavy_hex(5, 21)
+    # a new coupling map, so that no search result is cached
+    coupling_map = CouplingMap(edges)
+    start = perf_counter()
+    path, complete = coupling_map.longest_path(time_limit=0.2)
+    assert perf_counter() - start < 1
+    assert not complete
+    assert all(coupling_map.adjacent(q1, q2) for q1, q2 in zip(path[:-1], path[1:]))
+    step = ChainLayout(edges, exact=True, time_limit=0.2)
+    step.run()
+    # the greedy chain is used when the search is stopped
+    assert step.properties['layout'] == step.find_chain()
+
+
+def cached_run(edges, cache_dir):
+    """Runs ChainLayout with an empty in-process cache, so that the chain comes from *cache_dir* or a new search.
+
+    Args:
+        edges (list): the edges of the coupling map
+        cache_dir (str): the cache directory
+
+    Returns:
+        list: the chain
+    """
+    module._chains.clear()
+    step = ChainLayout(edges, cache_dir=cache_dir)
+    step.run()
+    return step.properties['layout']
+
+
+def test_cache_dir_round_trip(tmp_path, monkeypatch):
+    chains = {device: cached_run(edges, str(tmp_path)) for device, (edges, _) in CHAINS.items()}
+    # one file per device, named after its digest
+    assert sorted(os.listdir(str(tmp_path))) == sorted(
+        'chains_%s.json' % CouplingMap.from_edges(edges).digest for edges, _ in CHAINS.values())
+
+    def no_search(*args, **kwargs):
+        raise AssertionError('chain not read from the cache directory')
+
+    monkeypatch.setattr(ChainLayout, 'find_chain', no_search)
+    for device, (edges, _) in CHAINS.items():
+        assert cached_run(edges, str(tmp_path)) == chains[device]
+
+
+@pytest.mark.parametrize('content', ['{"(None, False', '[0, 1, 2]', '{"(None, False, 10, False)": "chain"}'])
+def test_cache_dir_corrupt_file(tmp_path, content):
+    edges, chains = CHAINS['tokyo']
+    path = os.path.join(str(tmp_path), 'chains_%s.json' % CouplingMap.from_edges(edges).digest)
+    with open(path, 'w') as file:
+        file.write(content)
+    assert cached_run(edges, str(tmp_path)) == chains[None]
+    # the file is replaced by a valid one
+    with open(path) as file:
+        assert json.load(file) == {'(None, False, 10, False)': chains[None]}
+
+
+@pytest.mark.parametrize('region', [False, True])
+def test_candidate_chains(region):
+    step = chain_layout(TOKYO, n_qubits=8, candidates=6, region=region)
+    qubits = step.best_region(8) if region else range(20)
+    chain = step.region_chain(8) if region else step.find_chain(n_qubits=8)
+    candidates = step.candidate_chains(chain, 8, region=region)
+    assert candidates[:2] == [chain, chain[::-1]]
+    assert len(candidates) == 6
+    assert len({tuple(candidate) for candidate in candidates}) == 6
+    for candidate in candidates:
+        assert len(set(candidate)) == len(candidate) >= 8
+        assert set(candidate).issubset(qubits)
+
+
+def test_best_candidate_in_region():
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', 8)
+    for i in range(8):
+        for j in range(i + 1, 8):
+            circuit.cx(q[i], q[j])
+    step = ChainLayout(TOKYO, n_qubits=8, candidates=6, region=True)
+    step.properties = {'circuit': circuit}
+    step.run()
+    assert sorted(step.properties['layout']) == step.best_region(8)
+
+
+def test_inverse_with_candidates():
+    with pytest.raises(StepError):
+        ChainLayout(TOKYO, inverse=True, candidates=2)
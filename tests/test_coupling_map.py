@@ -0,0 +1,24 @@
+from itertools import islice, permutations
+
+from padqc.coupling_map import CouplingMap, line
+from padqc.coupling_map import coupling_map as module
+from padqc.coupling_map.coupling_map import CHAIN_POSITIONS_CACHE_SIZE, COUPLING_MAP_CACHE_SIZE
+
+
+def test_coupling_map_cache_is_bounded():
+    first = CouplingMap.from_edges(line(2))
+    for n_qubits in range(3, COUPLING_MAP_CACHE_SIZE + 10):
+        CouplingMap.from_edges(line(n_qubits))
+    assert len(module._coupling_maps) == COUPLING_MAP_CACHE_SIZE
+    # evicted maps are built again, the most recent ones are reused
+    assert CouplingMap.from_edges(line(2)) is not first
+    assert CouplingMap.from_edges(line(COUPLING_MAP_CACHE_SIZE + 9)) is \
+        CouplingMap.from_edges(list(reversed(line(COUPLING_MAP_CACHE_SIZE + 9))))
+
+
+def test_chain_positions_cache_is_bounded():
+    coupling_map = CouplingMap.from_edges(line(8))
+    for chain in islice(permutations(range(8)), CHAIN_POSITIONS_CACHE_SIZE + 10):
+        coupling_map.chain_positions(chain)
+    assert len(coupling_map._chain_positions) == CHAIN_POSITIONS_CACHE_SIZE
+    assert coupling_map.chain_positions([3, 2, 1, 0]) == [3, 2, 1, 0, -1, -1, -1, -1]
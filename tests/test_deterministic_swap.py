@@ -0,0 +1,205 @@
+import random
+from copy import deepcopy
+
+import networkx as nx
+import numpy as np
+
+from padqc import QCircuit
+from padqc.coupling_map import MELBOURNE, TOKYO, CouplingMap, grid, heavy_hex, line
+from padqc.gates import Swap
+from padqc.steps import ChainLayout, DeterministicSwap
+from padqc.steps.deterministic_swap import offset_trial
+from simulation import on_device, same_routed_circuit
+
+
+def random_circuit(n_qubits, n_gates, rng):
+    """
+    Args:
+        n_qubits (int): the number of qubits
+        n_gates (int): the number of gates
+        rng (random.Random): the random number generator
+
+    Returns:
+        QCircuit: a random circuit of Hadamard and CNOT gates
+    """
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', n_qubits)
+    for _ in range(n_gates):
+        a, b = rng.sample(range(n_qubits), 2)
+        if rng.random() < 0.3:
+            circuit.h(q[a])
+        else:
+            circuit.cx(q[a], q[b])
+    return circuit
+
+
+def device(edges):
+    """
+    Args:
+        edges (list): the edges of the coupling map
+
+    Returns:
+        tuple: the coupling map and the chain of physical qubits found by ChainLayout
+    """
+    coupling_map = CouplingMap.from_edges(edges)
+    layout = ChainLayout(coupling_map)
+    layout.run()
+    return coupling_map, layout.properties['layout']
+
+
+def test_depth_bound_never_prunes_its_own_depth():
+    # a trial bounded by its own final depth is never aborted, so pruning can not change the best offset
+    rng = random.Random(1)
+    for edges in (TOKYO, MELBOURNE):
+        coupling_map, chain = device(edges)
+        for _ in range(10):
+            circuit = random_circuit(rng.randint(3, len(chain) - 2), rng.randint(10, 60), rng)
+            for offset in range(len(chain) - circuit.n_qubits + 1):
+                depth = offset_trial(circuit, coupling_map, chain, offset)
+                if depth != float('inf'):
+                    assert offset_trial(circuit, coupling_map, chain, offset, depth_bound=depth) == depth
+
+
+def test_swaps_are_decomposed():
+    rng = random.Random(2)
+    coupling_map, chain = device(TOKYO)
+    for native_swaps in (False, True):
+        circuit = random_circuit(10, 60, rng)
+        step = DeterministicSwap(coupling_map, offset=0, native_swaps=native_swaps)
+        step.properties = {'layout': chain}
+        step.run(circuit)
+        swaps = sum(1 for node in circuit.q_graph.graph.nodes if isinstance(node.gate, Swap))
+        assert (swaps > 0) == native_swaps
+        assert step.report['depth'] == circuit.q_graph.depth(swap_depth=3)
+
+
+def test_recursive_search_on_heavy_hex():
+    # no common neighbors on a depth-first chain of a heavy-hex lattice, so paths come from from_q1_to_q2()
+    coupling_map = CouplingMap.from_edges(heavy_hex(2, 7))
+    chain = list(nx.dfs_preorder_nodes(nx.Graph(coupling_map.edges), 0))
+    rng = random.Random(4)
+    circuit = random_circuit(len(chain), 40, rng)
+    routed = deepcopy(circuit)
+    step = DeterministicSwap(coupling_map, offset=0, recursive=True)
+    step.properties = {'layout': chain}
+    step.run(routed)
+    assert step.report['swaps'] > 0
+    assert on_device(routed, coupling_map, chain)
+    assert same_routed_circuit(circuit, routed, np.random.default_rng(4))
+
+
+def test_lookahead_moves_the_qubit_needed_next():
+    # moving q[0] next to q[2] leaves q[1] two qubits away from q[2], moving q[2] next to q[0] does not
+    coupling_map = CouplingMap.from_edges(line(4))
+    chain = [0, 1, 2, 3]
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', 4)
+    circuit.cx(q[0], q[2])
+    circuit.cx(q[1], q[2])
+    swaps = dict()
+    for lookahead in (0, 1):
+        routed = deepcopy(circuit)
+        step = DeterministicSwap(coupling_map, offset=0, lookahead=lookahead)
+        step.properties = {'layout': chain}
+        step.run(routed)
+        swaps[lookahead] = step.report['swaps']
+        assert on_device(routed, coupling_map, chain)
+        assert same_routed_circuit(circuit, routed, np.random.default_rng(5))
+    assert swaps == {0: 2, 1: 1}
+
+
+def test_lookahead_saves_swaps_on_random_circuits():
+    rng = random.Random(5)
+    coupling_map, chain = device(grid(3, 3))
+    swaps = {0: 0, 4: 0}
+    for _ in range(20):
+        circuit = random_circuit(len(chain), 20, rng)
+        for lookahead in swaps:
+            routed = deepcopy(circuit)
+            step = DeterministicSwap(coupling_map, offset=0, lookahead=lookahead)
+            step.properties = {'layout': chain}
+            step.run(routed)
+            swaps[lookahead] += step.report['swaps']
+            assert same_routed_circuit(circuit, routed, np.random.default_rng(5))
+    assert swaps[4] < swaps[0]
+
+
+def test_parallel_swaps_reduce_depth():
+    rng = random.Random(1)
+    coupling_map, chain = device(TOKYO)
+    depths = {False: 0, True: 0}
+    for _ in range(10):
+        circuit = random_circuit(len(chain), 100, rng)
+        for parallel in depths:
+            routed = deepcopy(circuit)
+            step = DeterministicSwap(coupling_map, offset=0, parallel=parallel)
+            step.properties = {'layout': chain}
+            step.run(routed)
+            depths[parallel] += step.report['depth']
+            assert on_device(routed, coupling_map, chain)
+    assert depths[True] < depths[False]
+
+
+class CheckedSwap(DeterministicSwap):
+    """DeterministicSwap checking that the window of next CNOTs of *routed_cx()* starts after the routed CNOT."""
+
+    def routed_cx(self, control, target, path):
+        assert self._cxs[self._cx_index] == (control, target)
+        super().routed_cx(control, target, path)
+
+
+def test_parallel_bridges():
+    rng = random.Random(6)
+    coupling_map, chain = device(TOKYO)
+    bridges = 0
+    for _ in range(5):
+        circuit = random_circuit(12, 60, rng)
+        routed = deepcopy(circuit)
+        step = CheckedSwap(coupling_map, offset=0, parallel=True, bridge=True)
+        step.properties = {'layout': chain}
+        step.run(routed)
+        bridges += step.report['bridges']
+        assert on_device(routed, coupling_map, chain)
+        assert same_routed_circuit(circuit, routed, np.random.default_rng(6))
+    assert bridges > 0
+
+
+def swap_rounds(circuit):
+    """
+    Args:
+        circuit (QCircuit): a compiled circuit with native SWAP gates
+
+    Returns:
+        int: the largest number of SWAP gates on a path of the circuit graph
+    """
+    rounds = dict()
+    for node in nx.topological_sort(circuit.q_graph.graph):
+        rounds[node] = max((rounds[pred] for pred in circuit.q_graph.graph.predecessors(node)), default=0) + \
+            isinstance(node.gate, Swap)
+    return max(rounds.values())
+
+
+def test_swap_network():
+    # ZZ interactions between every pair of qubits, routed with odd-even transpositions of the line
+    n_qubits = 6
+    coupling_map = CouplingMap.from_edges(line(n_qubits))
+    chain = list(range(n_qubits))
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', n_qubits)
+    rng = random.Random(7)
+    for i in range(n_qubits):
+        circuit.h(q[i])
+    for i in range(n_qubits):
+        for j in range(i + 1, n_qubits):
+            circuit.cx(q[i], q[j])
+            circuit.rz(q[j], rng.uniform(0, 2 * np.pi))
+            circuit.cx(q[i], q[j])
+    routed = deepcopy(circuit)
+    step = DeterministicSwap(coupling_map, offset=0, swap_network=True, native_swaps=True)
+    step.properties = {'layout': chain}
+    step.run(routed)
+    assert on_device(routed, coupling_map, chain)
+    assert same_routed_circuit(circuit, routed, np.random.default_rng(7))
+    # the SWAPs of a round act on disjoint pairs, so there are at most n_qubits rounds of them
+    assert step.report['swaps'] > n_qubits
+    assert swap_rounds(routed) <= n_qubits
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+# the repository root, where padqc is imported from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time budget in seconds, as paid by every worker process and short-lived script.
+# numpy and networkx take about 0.7 s, Qiskit alone takes seconds
+IMPORT_BUDGET = 2.0
+
+# optional dependencies that must be loaded only on first use
+LAZY_MODULES = ['qiskit', 'sympy', 'PIL', 'pydot']
+
+SCRIPT = """
+import sys
+from time import perf_counter
+start = perf_counter()
+import padqc
+import padqc.converters
+import padqc.tools
+print(perf_counter() - start)
+print(','.join(m for m in %r if m in sys.modules))
+""" % LAZY_MODULES
+
+
+def import_padqc():
+    """Imports padqc, padqc.converters and padqc.tools in a fresh interpreter.
+
+    Returns:
+        tuple: the import time in seconds and the list of lazy modules loaded by the import
+    """
+    output = subprocess.run([sys.executable, '-c', SCRIPT], check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True, cwd=ROOT).stdout.split('\n')
+    return float(output[0]), [m for m in output[1].split(',') if m]
+
+
+def test_optional_dependencies_not_loaded():
+    _, loaded = import_padqc()
+    assert loaded == []
+
+
+def test_import_time():
+    import_time = min(import_padqc()[0] for _ in range(5))
+    assert import_time < IMPORT_BUDGET, 'padqc import takes %.3f s, budget is %.3f s' % (import_time, IMPORT_BUDGET)
@@ -0,0 +1,55 @@
+import networkx as nx
+import pytest
+
+from padqc.coupling_map import DEVICES, CouplingMap, CouplingMapError, device, grid, heavy_hex, line, ring
+
+
+def check_edges(edges, n_qubits, n_edges):
+    """
+    Args:
+        edges (list): the edges of a coupling map
+        n_qubits (int): the expected number of qubits, numbered from 0
+        n_edges (int): the expected number of undirected edges
+    """
+    graph = nx.Graph(edges)
+    assert sorted(graph.nodes) == list(range(n_qubits))
+    assert graph.number_of_edges() == n_edges
+    assert nx.is_connected(graph)
+    assert all(q1 != q2 for q1, q2 in edges)
+
+
+@pytest.mark.parametrize('name, n_qubits, n_edges', [('melbourne', 14, 18), ('tokyo', 20, 35), ('almaden', 20, 23),
+                                                      ('rochester', 53, 58)])
+def test_devices(name, n_qubits, n_edges):
+    check_edges(DEVICES[name], n_qubits, n_edges)
+    coupling_map = device(name)
+    assert isinstance(coupling_map, CouplingMap)
+    assert coupling_map is CouplingMap.from_edges(DEVICES[name])
+    assert coupling_map.n_qubits == n_qubits
+
+
+def test_unknown_device():
+    with pytest.raises(CouplingMapError):
+        device('yorktown')
+
+
+def test_generated_coupling_maps():
+    check_edges(line(5), 5, 4)
+    check_edges(ring(5), 5, 5)
+    check_edges(grid(3, 4), 12, 17)
+    # the lattices of the 127 and 433 qubit IBM devices
+    check_edges(heavy_hex(5, 21), 127, 144)
+    check_edges(heavy_hex(23, 15), 433, 498)
+    for edges in (line(5), ring(5), grid(3, 4), heavy_hex(2, 7)):
+        assert sorted(edges) == sorted((q2, q1) for q1, q2 in edges)
+    # ring neighbors, grid rows and columns, heavy-hex bridges between rows
+    assert nx.Graph(ring(5)).has_edge(4, 0)
+    assert set(nx.Graph(grid(3, 4))[5]) == {1, 4, 6, 9}
+    assert set(nx.Graph(heavy_hex(2, 7))[14]) == {0, 7}
+
+
+@pytest.mark.parametrize('generator, args', [(line, (1,)), (ring, (2,)), (grid, (1, 1)), (heavy_hex, (0, 5)),
+                                             (heavy_hex, (2, 2))])
+def test_too_small_coupling_maps(generator, args):
+    with pytest.raises(CouplingMapError):
+        generator(*args)
@@ -0,0 +1,99 @@
+import random
+from copy import deepcopy
+
+import numpy as np
+import pytest
+from networkx import topological_sort
+
+from padqc import QCircuit, pack, unpack_counts
+from padqc.coupling_map import ROCHESTER, TOKYO, heavy_hex
+from padqc.gates import Cx, Swap
+from padqc.gates.single_q_gates import Hadamard, Pauli_X, Measure
+
+# the unitary matrices of the simulated gates, the first qubit is the most significant
+_UNITARIES = {
+    Pauli_X: np.array([[0, 1], [1, 0]]),
+    Hadamard: np.array([[1, 1], [1, -1]]) / np.sqrt(2),
+    Cx: np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]]),
+    Swap: np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]]),
+}
+
+
+def classical_circuit(n_qubits, n_gates, rng, n_registers=1):
+    """
+    Args:
+        n_qubits (int): the number of qubits
+        n_gates (int): the number of gates
+        rng (random.Random): the random number generator
+        n_registers (int): the number of classical registers the qubits are measured into
+
+    Returns:
+        QCircuit: a random circuit of X and CNOT gates, measuring every qubit
+    """
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', n_qubits)
+    sizes = [n_qubits // n_registers + (1 if i < n_qubits % n_registers else 0) for i in range(n_registers)]
+    c = [bit for i, size in enumerate(sizes) for bit in circuit.add_c_register('c%d' % i, size)]
+    for _ in range(n_gates):
+        a, b = rng.sample(range(n_qubits), 2)
+        if rng.random() < 0.3:
+            circuit.x(q[a])
+        else:
+            circuit.cx(q[a], q[b])
+    circuit.measure(q, c)
+    return circuit
+
+
+def simulate(circuit):
+    """Runs a circuit of X, Hadamard, CNOT and SWAP gates, measured at the end, on a state vector.
+    The circuit must end in a basis state, as the X and CNOT circuits compiled by pack().
+
+    Args:
+        circuit (QCircuit): the circuit
+
+    Returns:
+        str: the measured bit string in the Qiskit format, the last classical register first,
+            every register from its last bit, registers separated by spaces
+    """
+    axes = {q_arg: axis for axis, q_arg in enumerate(circuit.q_regs_list)}
+    state = np.zeros((2,) * len(axes), dtype=complex)
+    state[(0,) * len(axes)] = 1
+    measures = dict()
+    for node in topological_sort(circuit.q_graph.graph):
+        gate = node.gate
+        if isinstance(gate, Measure):
+            measures[gate.c_arg] = axes[gate.q_args[0]]
+        elif type(gate) in _UNITARIES:
+            targets = [axes[q_arg] for q_arg in gate.q_args]
+            unitary = _UNITARIES[type(gate)].reshape((2,) * 2 * len(targets))
+            state = np.moveaxis(np.tensordot(unitary, state, axes=(list(range(len(targets), 2 * len(targets))),
+                                                                   targets)),
+                                list(range(len(targets))), targets)
+    basis = np.unravel_index(np.argmax(np.abs(state)), state.shape)
+    assert abs(abs(state[basis]) - 1) < 1e-9
+    registers = sorted(circuit.c_regs.values(), reverse=True)
+    return ' '.join(''.join(str(basis[measures[(reg_id, i)]]) for i in reversed(range(dim)))
+                    for reg_id, dim in registers)
+
+
+def test_pack_measured_circuits():
+    rng = random.Random(3)
+    circuits = [classical_circuit(5, 30, rng), classical_circuit(4, 20, rng, n_registers=2),
+                classical_circuit(6, 40, rng)]
+    expected = [simulate(circuit) for circuit in circuits]
+    merged, packing = pack(deepcopy(circuits), TOKYO)
+    assert len(set(merged.properties['layout'])) == sum(circuit.n_qubits for circuit in circuits)
+    counts = unpack_counts({simulate(merged): 1024}, merged, packing)
+    assert counts == [{bits: 1024} for bits in expected]
+
+
+@pytest.mark.parametrize('coupling_map', [ROCHESTER, heavy_hex(5, 21)])
+def test_pack_on_heavy_hex(coupling_map):
+    # find_chain() can not connect every qubit of these devices, the chain only needs the qubits of the circuits
+    rng = random.Random(4)
+    circuits = [classical_circuit(4, 20, rng), classical_circuit(3, 15, rng), classical_circuit(5, 25, rng)]
+    expected = [simulate(circuit) for circuit in circuits]
+    merged, packing = pack(deepcopy(circuits), coupling_map)
+    assert len(set(merged.properties['layout'])) == sum(circuit.n_qubits for circuit in circuits)
+    counts = unpack_counts({simulate(merged): 1024}, merged, packing)
+    assert counts == [{bits: 1024} for bits in expected]
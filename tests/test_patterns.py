@@ -0,0 +1,69 @@
+from copy import deepcopy
+
+import numpy as np
+
+from padqc import QCircuit
+from padqc.coupling_map import grid
+from padqc.steps import Patterns
+from simulation import random_state, same_state, simulate
+
+# a 2x3 grid and a chain through it, where wires 0 and 5 are neighbors on the device
+GRID = grid(2, 3)
+CHAIN = [0, 1, 2, 5, 4, 3]
+
+
+def cascade(n_qubits, target, controls):
+    """
+    Args:
+        n_qubits (int): the number of qubits
+        target (int): the target wire
+        controls (list): the control wires, in the order the CNOTs are applied
+
+    Returns:
+        QCircuit: a CNOT cascade
+    """
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', n_qubits)
+    for control in controls:
+        circuit.cx(q[control], q[target])
+    return circuit
+
+
+def run_patterns(circuit, coupling_map=None):
+    """
+    Args:
+        circuit (QCircuit): the circuit, it is not modified
+        coupling_map (list): the coupling map of the routing-aware mode
+
+    Returns:
+        tuple: the transformed circuit and the step
+    """
+    circuit = deepcopy(circuit)
+    step = Patterns(coupling_map=coupling_map)
+    step.properties = {'layout': CHAIN}
+    step.run(circuit)
+    return circuit, step
+
+
+def test_routing_aware_cascade_is_cheaper():
+    circuit = cascade(5, 1, [2, 0, 4, 3])
+    _, default = run_patterns(circuit)
+    routed, step = run_patterns(circuit, GRID)
+    assert 'patterns_report' not in default.properties
+    report = step.properties['patterns_report']
+    assert report == {'cx': 6, 'routed_cx': 3, 'depth': 6, 'routed_depth': 3}
+    state = random_state(5, np.random.default_rng(0))
+    assert same_state(simulate(routed, state), simulate(circuit, state))
+
+
+def test_routing_aware_cost_never_higher():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        target = int(rng.integers(6))
+        controls = [int(c) for c in rng.permutation(6) if c != target]
+        circuit = cascade(6, target, controls)
+        routed, step = run_patterns(circuit, GRID)
+        report = step.properties['patterns_report']
+        assert report['routed_cx'] <= report['cx'] and report['routed_depth'] <= report['depth']
+        state = random_state(6, rng)
+        assert same_state(simulate(routed, state), simulate(circuit, state))
@@ -0,0 +1,80 @@
+import os
+import random
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from padqc import QCircuit
+from padqc.converters import circuit_from_qasm, qasm_from_circuit
+from simulation import random_state, same_state, simulate
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks_qasm')
+
+
+def random_circuit(n_qubits, n_gates, rng):
+    """
+    Args:
+        n_qubits (int): the number of qubits
+        n_gates (int): the number of gates
+        rng (random.Random): the random number generator
+
+    Returns:
+        QCircuit: a random circuit of every gate that can be written as QASM, measuring every qubit
+    """
+    circuit = QCircuit()
+    q = circuit.add_q_register('q', n_qubits)
+    c = circuit.add_c_register('c', n_qubits)
+    for _ in range(n_gates):
+        a, b = rng.sample(range(n_qubits), 2)
+        kind = rng.choice(['id', 'x', 'y', 'z', 'h', 'rx', 'ry', 'rz', 'u3', 'cx', 'cx', 'swap', 'barrier'])
+        if kind in ('rx', 'ry', 'rz'):
+            getattr(circuit, kind)(q[a], rng.uniform(-np.pi, np.pi))
+        elif kind == 'u3':
+            circuit.dummy_gate(name='u3', q_args=[q[a]], params=[rng.uniform(-np.pi, np.pi) for _ in range(3)])
+        elif kind in ('cx', 'swap'):
+            getattr(circuit, kind)(q[a], q[b])
+        elif kind == 'barrier':
+            circuit.barrier(q[a], q[b])
+        else:
+            getattr(circuit, kind)(q[a])
+    for i in range(n_qubits):
+        circuit.measure(q[i], c[i])
+    return circuit
+
+
+def check_round_trip(circuit, rng):
+    """Writes a circuit as QASM with and without merging one qubit gates and parses it back.
+
+    Args:
+        circuit (QCircuit): the circuit, it is not modified
+        rng (numpy.random.Generator): the random number generator of the initial state
+
+    Returns:
+        dict: the QASM written with optimize False and True
+    """
+    state = random_state(circuit.n_qubits, rng)
+    expected = simulate(circuit, state)
+    qasm = dict()
+    for optimize in (False, True):
+        qasm[optimize] = qasm_from_circuit(deepcopy(circuit), optimize=optimize)
+        parsed = circuit_from_qasm(qasm[optimize])
+        assert parsed.q_regs == circuit.q_regs and parsed.c_regs == circuit.c_regs
+        assert same_state(simulate(parsed, state), expected)
+    return qasm
+
+
+def test_write_qasm_round_trip():
+    rng = random.Random(1)
+    for _ in range(5):
+        qasm = check_round_trip(random_circuit(5, 80, rng), np.random.default_rng(1))
+        assert qasm[True].count('measure') == qasm[False].count('measure') == 5
+        assert qasm[True].count('cx') == qasm[False].count('cx')
+        assert qasm[True].count('u3') < qasm[False].count('u3')
+
+
+@pytest.mark.parametrize('name', ['4gt11_82.qasm', 'ghz_4.qasm', 'H2_UCCSD.qasm', 'random0_n5_d5.qasm'])
+def test_write_qasm_round_trip_of_benchmarks(name):
+    with open(os.path.join(BENCHMARKS, name)) as file:
+        circuit = circuit_from_qasm(file.read())
+    check_round_trip(circuit, np.random.default_rng(2))
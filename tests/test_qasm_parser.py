@@ -0,0 +1,172 @@
+import os
+from math import cos, exp, isclose, log, pi, sin, sqrt, tan
+
+import numpy as np
+import pytest
+from networkx import topological_sort
+
+from padqc.converters import QasmError, circuit_from_qasm, qasm_from_circuit
+from padqc.converters import qasm_parser
+from padqc.converters.qasm_parser import EXPANSION_CACHE_SIZE, evaluate, gate_expansion
+from padqc.gates.base_gates import Input, Output, Classic
+from simulation import CX, apply, random_state, same_state, simulate, u3
+
+HEADER = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[3];\ncreg c[3];\n'
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks_qasm')
+
+TOFFOLI = np.eye(8)[[0, 1, 2, 3, 4, 5, 7, 6]]
+
+
+def zz(theta):
+    """
+    Args:
+        theta (float): the rotation angle
+
+    Returns:
+        numpy.ndarray: the unitary matrix of cx a,b; rz(theta) b; cx a,b
+    """
+    return np.diag([1, np.exp(1j * theta), np.exp(1j * theta), 1])
+
+
+# gate statements on the register q[3] and the unitary matrices they apply, as (matrix, qubits)
+GATES = [
+    ('ccx q[0],q[1],q[2];', [(TOFFOLI, [0, 1, 2])]),
+    ('ccx q[2],q[0],q[1];', [(TOFFOLI, [2, 0, 1])]),
+    ('u2(0.3,-1.1) q[1];', [(u3(pi / 2, 0.3, -1.1), [1])]),
+    ('u3(0.5,0.2,-0.7) q[2];', [(u3(0.5, 0.2, -0.7), [2])]),
+    ('u3(-pi/4,pi^2/8,1e-1) q;', [(u3(-pi / 4, pi ** 2 / 8, 0.1), [i]) for i in range(3)]),
+    ('cx q[1],q[0];', [(CX, [1, 0])]),
+    ('gate zz(theta) a,b { cx a,b; rz(theta) b; cx a,b; }\nzz(2*pi/3) q[2],q[0];', [(zz(2 * pi / 3), [2, 0])]),
+    ('gate rot(a,b) x { u3(a/2,b,-b) x; barrier x; ry(-a) x; }\nrot(0.8,0.1) q[0];',
+     [(u3(0.4, 0.1, -0.1), [0]), (u3(-0.8, 0, 0), [0])]),
+    ('gate inner a,b { cx b,a; }\ngate outer a,b,c { inner a,b; ccx a,b,c; }\nouter q[1],q[2],q[0];',
+     [(CX, [2, 1]), (TOFFOLI, [1, 2, 0])]),
+]
+
+
+def gate_sequences(circuit):
+    """
+    Args:
+        circuit (QCircuit): a circuit
+
+    Returns:
+        dict: the gates on every qubit in circuit order, as (name, rounded parameters, qubits)
+    """
+    sequences = dict()
+    for node in topological_sort(circuit.q_graph.graph):
+        gate = node.gate
+        if isinstance(gate, (Input, Output, Classic)):
+            continue
+        params = tuple(round(float(param), 9) for param in getattr(gate, 'params', ()))
+        for q_arg in gate.q_args:
+            sequences.setdefault(q_arg, list()).append((gate.name, params, tuple(gate.q_args)))
+    return sequences
+
+
+def test_expansion_cache_is_bounded():
+    for i in range(EXPANSION_CACHE_SIZE + 100):
+        gate_expansion('rz', [i * 1e-3])
+    expansions = qasm_parser._library[0]._expansions
+    assert len(expansions) == EXPANSION_CACHE_SIZE
+    # the most recent expansions are kept
+    assert ('rz', ((EXPANSION_CACHE_SIZE + 99) * 1e-3,)) in expansions
+    assert gate_expansion('rz', [0.5]) == gate_expansion('u1', [0.5])
+
+
+@pytest.mark.parametrize('statement, unitaries', GATES)
+def test_gate_semantics(statement, unitaries):
+    circuit = circuit_from_qasm(HEADER + statement)
+    state = random_state(3, np.random.default_rng(1))
+    expected = state
+    for unitary, axes in unitaries:
+        expected = apply(expected, unitary, axes)
+    assert same_state(simulate(circuit, state), expected)
+
+
+def test_round_trip_of_benchmarks():
+    # the smaller benchmark circuits, written without merging gates, are parsed back to the same gates
+    for name in sorted(os.listdir(BENCHMARKS)):
+        path = os.path.join(BENCHMARKS, name)
+        if os.path.getsize(path) > 10000:
+            continue
+        with open(path) as file:
+            circuit = circuit_from_qasm(file.read())
+        parsed = circuit_from_qasm(qasm_from_circuit(circuit))
+        assert gate_sequences(parsed) == gate_sequences(circuit), name
+
+
+@pytest.mark.parametrize('statement', [
+    'foo q[0];',
+    'cx q[0],q[3];',
+    'measure q[1] -> c[3];',
+    'cx q[0];',
+    'u3(0.1,0.2) q[0];',
+    'cx q[1],q[1];',
+    'opaque magic a;',
+    'reset q[0];',
+    'if(c==1) x q[0];',
+    'gate x a { h a; }',
+    'gate bad a { cx a,b; }',
+    'rz(theta) q[0];',
+    'rz(ln(0)) q[0];',
+    'h r[0];',
+])
+def test_parser_errors(statement):
+    with pytest.raises(QasmError):
+        circuit_from_qasm(HEADER + statement)
+
+
+def test_include_only_qelib1():
+    with pytest.raises(QasmError):
+        circuit_from_qasm('OPENQASM 2.0;\ninclude "other.inc";\n')
+    with pytest.raises(QasmError):
+        circuit_from_qasm('OPENQASM 3.0;\n')
+
+
+@pytest.mark.parametrize('expression, value', [
+    ('pi', pi),
+    ('-pi/2', -pi / 2),
+    ('1e-3', 1e-3),
+    ('.5+2.', 2.5),
+    ('sin(pi/6)', sin(pi / 6)),
+    ('cos(0.3)+tan(0.2)', cos(0.3) + tan(0.2)),
+    ('exp(1)*ln(2)', exp(1) * log(2)),
+    ('sqrt(2)/2', sqrt(2) / 2),
+    ('2+3*4', 14),
+    ('(2+3)*4', 20),
+    ('8/4/2', 1),
+    ('5-3-1', 1),
+    ('2*-3', -6),
+    ('-2^2', -4),
+    ('2^3^2', 512),
+    ('2^-1', 0.5),
+    ('3*2^2', 12),
+    ('--pi', pi),
+    ('+1', 1),
+    ('sin(pi/4)^2*2', 1),
+])
+def test_evaluate(expression, value):
+    assert isclose(evaluate(expression), value, abs_tol=1e-12)
+
+
+@pytest.mark.parametrize('expression', [
+    '__import__("os")',
+    'theta',
+    'e',
+    'abs(1)',
+    'pi.real',
+    'sin.__class__',
+    '(1).__class__',
+    '[1][0]',
+    '1 2',
+    '2**3',
+    'sin(1',
+    '1/0',
+    'ln(0)',
+    'sqrt(-1)',
+    '',
+])
+def test_evaluate_rejects(expression):
+    with pytest.raises(QasmError):
+        evaluate(expression)